@@ -0,0 +1,185 @@
+"""
+Record/replay cassettes for tool and LLM I/O.
+
+A kickoff re-clones the repository, re-walks the tree and re-queries the
+LLM, which makes iterating on ``tasks.yaml`` prompts against a fixed set of
+repositories slow and non-deterministic. While a cassette is recording,
+every tool call decorated with ``@recorded`` and every LLM exchange made
+through ``RoutedLLM`` is captured together with the kickoff inputs into a
+gzipped JSON file. In replay mode tool calls are served from the cassette,
+and LLM exchanges are served when the exact same messages were recorded,
+so only tasks whose prompt (or upstream output) changed reach the LLM.
+
+Responses are stored per request key as a list and replayed in order, so
+identical requests that received different answers replay faithfully.
+
+Tools that change the working directory (``@recorded(setup=True)``, e.g.
+cloning) are not executed while replaying, so their calls are recorded with
+their arguments. The first tool call that misses the cassette re-runs them
+for real before executing, so it sees the same checkout the recording did.
+If a re-run setup call fails (``succeeded`` rejects its result), the replay
+cannot reproduce the recording's checkout and the cassette records a
+``setup_error`` instead of letting tools run against whatever is on disk.
+"""
+
+import contextlib
+import functools
+import gzip
+import hashlib
+import json
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+CASSETTE_VERSION = 1
+
+_active: Optional["Cassette"] = None
+
+# Undecorated functions of @recorded tools, for re-running setup calls on a replay miss
+_tools: Dict[str, Callable] = {}
+# Result checks of setup tools, e.g. whether a clone reported success
+_setup_checks: Dict[str, Callable[[Any], bool]] = {}
+
+
+def _key(*parts: Any) -> str:
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+class Cassette:
+    """Tool and LLM exchanges for one kickoff"""
+
+    def __init__(self, path: str, mode: str = "record", inputs: Optional[dict] = None):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.inputs = inputs or {}
+        self.tools: Dict[str, List[Any]] = {}
+        self.llm: Dict[str, List[Any]] = {}
+        self.setup: List[dict] = []
+        self.stats = {"tool_hits": 0, "tool_misses": 0, "llm_hits": 0, "llm_misses": 0}
+        self._cursors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._setup_lock = threading.Lock()
+        self._setup_done = False
+        self.setup_error: Optional[str] = None
+
+    @classmethod
+    def load(cls, path: str, mode: str = "replay") -> "Cassette":
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != CASSETTE_VERSION:
+            raise ValueError(f"Unsupported cassette version in {path}: {data.get('version')}")
+        cassette = cls(path, mode, data.get("inputs"))
+        cassette.tools = data.get("tools", {})
+        cassette.llm = data.get("llm", {})
+        cassette.setup = data.get("setup", [])
+        return cassette
+
+    def save(self, path: Optional[str] = None):
+        with gzip.open(path or self.path, "wt", encoding="utf-8") as f:
+            json.dump({
+                "version": CASSETTE_VERSION,
+                "inputs": self.inputs,
+                "tools": self.tools,
+                "llm": self.llm,
+                "setup": self.setup,
+            }, f, separators=(",", ":"))
+
+    def rewind(self):
+        """Replay from the first recorded response again, e.g. for the next kickoff of a test run"""
+        with self._lock:
+            self._cursors.clear()
+
+    def _run_setup(self):
+        """Re-run recorded setup calls (clones) once, so a live tool call finds their results on disk"""
+        with self._setup_lock:
+            if not self._setup_done:
+                self._setup_done = True
+                for entry in self.setup:
+                    fn = _tools.get(entry["name"])
+                    if fn is None:
+                        self.setup_error = f"Cassette {self.path} needs setup tool {entry['name']}, which is not loaded"
+                        break
+                    result = fn(*entry["args"], **entry["kwargs"])
+                    check = _setup_checks.get(entry["name"])
+                    if check is not None and not check(result):
+                        self.setup_error = f"Cassette {self.path} could not re-run {entry['name']}: {result}"
+                        break
+            if self.setup_error:
+                raise RuntimeError(self.setup_error)
+
+    def _play(self, store: Dict[str, List[Any]], kind: str, key: str, call: Callable[[], Any],
+              before_miss: Optional[Callable[[], None]] = None) -> Any:
+        with self._lock:
+            if self.mode == "replay":
+                cursor = self._cursors.get(key, 0)
+                recorded = store.get(key, [])
+                if cursor < len(recorded):
+                    self._cursors[key] = cursor + 1
+                    self.stats[f"{kind}_hits"] += 1
+                    return recorded[cursor]
+            self.stats[f"{kind}_misses"] += 1
+
+        if before_miss is not None:
+            before_miss()
+        result = call()
+        # Only plain strings are recorded; structured function-call results are not replayable
+        if self.mode == "record" and isinstance(result, str):
+            with self._lock:
+                store.setdefault(key, []).append(result)
+        return result
+
+    def tool_call(self, name: str, args: tuple, kwargs: dict, call: Callable[[], Any], setup: bool = False) -> Any:
+        if self.mode == "record" and setup:
+            with self._lock:
+                self.setup.append({"name": name, "args": list(args), "kwargs": kwargs})
+        # A missed setup call does its own setup; any other miss needs the recorded ones first
+        before_miss = self._run_setup if self.mode == "replay" and not setup else None
+        return self._play(self.tools, "tool", _key(name, args, kwargs), call, before_miss)
+
+    def llm_call(self, messages: Any, tools: Optional[list], call: Callable[[], Any]) -> Any:
+        return self._play(self.llm, "llm", _key(messages, tools), call)
+
+
+def active_cassette() -> Optional[Cassette]:
+    return _active
+
+
+@contextlib.contextmanager
+def use_cassette(cassette: Cassette):
+    """Activate a cassette for the duration of a kickoff, saving it afterwards when recording"""
+    global _active
+    previous, _active = _active, cassette
+    try:
+        yield cassette
+    finally:
+        _active = previous
+        if cassette.mode == "record":
+            cassette.save()
+
+
+def recorded(fn: Optional[Callable] = None, *, setup: bool = False,
+             succeeded: Optional[Callable[[Any], bool]] = None) -> Callable:
+    """
+    Capture/serve a tool function's output through the active cassette.
+
+    ``setup=True`` marks tools whose side effects later tools rely on; their
+    calls are re-run when a replay has to execute a tool for real, and
+    ``succeeded`` tells from the result whether that re-run worked.
+    """
+    def decorate(fn: Callable) -> Callable:
+        _tools[fn.__name__] = fn
+        if succeeded is not None:
+            _setup_checks[fn.__name__] = succeeded
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            cassette = _active
+            if cassette is None:
+                return fn(*args, **kwargs)
+            return cassette.tool_call(fn.__name__, args, kwargs, lambda: fn(*args, **kwargs), setup=setup)
+
+        return wrapper
+
+    return decorate(fn) if fn is not None else decorate
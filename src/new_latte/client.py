@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+"""
+Thin command-line client for the NewLatte daemon (see server.py).
+
+    client submit https://github.com/user/repo [--wait]
+    client status <job-id>
+    client list
+    client cancel <job-id>
+
+The server address comes from --socket/--url or NEW_LATTE_SERVER, which is
+either a Unix socket path or an http:// URL.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import socket
+import sys
+import time
+from urllib.parse import urlparse
+
+from new_latte.defaults import DEFAULT_HOST, DEFAULT_PORT, TERMINAL_STATUSES
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection that talks to a Unix domain socket"""
+
+    def __init__(self, socket_path: str, timeout: float = 30):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def _connection(server: str) -> http.client.HTTPConnection:
+    if server.startswith("http://"):
+        url = urlparse(server)
+        return http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+    return UnixHTTPConnection(server)
+
+
+def request(server: str, method: str, path: str, payload=None):
+    """Send one API request and return (status, decoded JSON body)"""
+    connection = _connection(server)
+    try:
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body else {}
+        connection.request(method, path, body=body, headers=headers)
+        response = connection.getresponse()
+        return response.status, json.loads(response.read() or b"null")
+    finally:
+        connection.close()
+
+
+def main():
+    """
+    Talk to a running NewLatte daemon.
+    """
+    parser = argparse.ArgumentParser(description="NewLatte daemon client")
+    parser.add_argument("--url", help="Daemon URL, e.g. http://127.0.0.1:8765")
+    parser.add_argument("--socket", help="Daemon Unix socket path")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    submit = commands.add_parser("submit", help="Queue a repository for analysis")
+    submit.add_argument("github_repo_url")
+    submit.add_argument("--wait", action="store_true", help="Poll until the job finishes")
+    commands.add_parser("list", help="List jobs")
+    for name in ("status", "cancel"):
+        command = commands.add_parser(name, help=f"{name.capitalize()} a job")
+        command.add_argument("job_id")
+
+    args = parser.parse_args(sys.argv[1:])
+    server = (args.socket or args.url or os.getenv("NEW_LATTE_SERVER")
+              or f"http://{DEFAULT_HOST}:{DEFAULT_PORT}")
+
+    try:
+        if args.command == "submit":
+            status, body = request(server, "POST", "/jobs", {"github_repo_url": args.github_repo_url})
+            while args.wait and status < 400 and body["status"] not in TERMINAL_STATUSES:
+                time.sleep(1)
+                status, body = request(server, "GET", f"/jobs/{body['id']}")
+        elif args.command == "list":
+            status, body = request(server, "GET", "/jobs")
+        elif args.command == "status":
+            status, body = request(server, "GET", f"/jobs/{args.job_id}")
+        else:
+            status, body = request(server, "DELETE", f"/jobs/{args.job_id}")
+    except OSError as e:
+        raise Exception(f"Could not reach the NewLatte daemon at {server}: {e}")
+
+    print(json.dumps(body, indent=2))
+    if status >= 400 or (isinstance(body, dict) and body.get("status") == "failed"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,9 @@ from crewai import Agent, Crew, Process, Task, LLM
 from crewai.project import CrewBase, agent, crew, task
 from crewai.agents.agent_builder.base_agent import BaseAgent
 from crewai.tools import tool
+from crewai.utilities.task_output_storage_handler import TaskOutputStorageHandler
 from typing import List
+from concurrent.futures import ThreadPoolExecutor
 import os
 import subprocess
 import requests
@@ -12,17 +14,37 @@ import tempfile
 import shutil
 from urllib.parse import urlparse
 
+from new_latte.cassette import recorded
+from new_latte.llm_router import build_llm
+from new_latte.tools.analysis_cache import revision_cached
+from new_latte.tools.dependency_cache import detect_package_manager, render_cache_steps
+from new_latte.tools.manifest_parser import extract_dependencies
+from new_latte.tools.mirror_store import get_mirror_store
+from new_latte.tools.test_sharding import estimate_test_suite, render_shard_matrix
+
+# Analysis results are reused while the cloned HEAD commit is unchanged
+detect_package_manager = revision_cached(detect_package_manager)
+estimate_test_suite = revision_cached(estimate_test_suite)
+
 # Define all custom tools inline using @tool decorator
+# (@recorded tools are captured by, and served from, an active cassette)
 @tool
+@recorded(setup=True, succeeded=lambda result: str(result).startswith("Successfully cloned"))
 def clone_repository(repo_url: str, target_dir: str = "./cloned_repo") -> str:
     """Clone a Git repository to a local folder named 'cloned_repo'"""
     try:
         # Create target_dir if it doesn't exist
         os.makedirs(target_dir, exist_ok=True)
 
+        # Clone from the local mirror when a mirror store is configured
+        source = repo_url
+        store = get_mirror_store()
+        if store is not None:
+            source = "file://" + store.ensure(repo_url)
+
         # Clone the repository
         result = subprocess.run(
-            ['git', 'clone', '--depth', '1', repo_url, target_dir], 
+            ['git', 'clone', '--depth', '1', source, target_dir], 
             capture_output=True, 
             text=True, 
             timeout=300
@@ -65,6 +87,7 @@ def clone_repository(repo_url: str, target_dir: str = "./cloned_repo") -> str:
 #         return f"Error cloning repository: {str(e)}"
 
 @tool
+@recorded
 def analyze_repository_structure(repo_path: str) -> str:
     """Analyze the structure of a cloned repository"""
     try:
@@ -131,6 +154,7 @@ def analyze_repository_structure(repo_path: str) -> str:
         return f"Error analyzing repository structure: {str(e)}"
 
 @tool
+@recorded
 def read_file_content(file_path: str, max_lines: int = 100) -> str:
     """Read and return content of a specific file with line limit"""
     try:
@@ -152,6 +176,7 @@ def read_file_content(file_path: str, max_lines: int = 100) -> str:
         return f"Error reading file {file_path}: {str(e)}"
 
 @tool
+@recorded
 def detect_python_frameworks(repo_path: str) -> str:
     """Detect Python testing frameworks and build tools in the repository"""
     try:
@@ -161,40 +186,83 @@ def detect_python_frameworks(repo_path: str) -> str:
             "web_framework": "none"
         }
         
-        # Check requirements files and pyproject.toml for framework indicators
-        req_files = ['requirements.txt', 'requirements-dev.txt', 'pyproject.toml']
+        # Normalized dependency set from every manifest and lockfile
+        dependencies = extract_dependencies(repo_path)
+        names = set(dependencies['names'])
+        groups = {dep['group'] for dep in dependencies['dependencies']}
+        build_system = dependencies['build_system']
+        
+        # Test framework detection
+        if 'pytest' in names:
+            frameworks_found["testing_framework"] = "pytest"
+        elif 'test' in groups or any(os.path.isdir(os.path.join(repo_path, d)) for d in ('tests', 'test')):
+            frameworks_found["testing_framework"] = "unittest"
         
-        for req_file in req_files:
-            file_path = os.path.join(repo_path, req_file)
-            if os.path.exists(file_path):
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read().lower()
-                    
-                # Test framework detection
-                if 'pytest' in content:
-                    frameworks_found["testing_framework"] = "pytest"
-                elif 'unittest' in content or 'test' in content:
-                    frameworks_found["testing_framework"] = "unittest"
-                
-                # Build tool detection
-                if 'poetry' in content:
-                    frameworks_found["build_tool"] = "poetry"
-                elif 'setuptools' in content or 'setup.py' in os.listdir(repo_path):
-                    frameworks_found["build_tool"] = "setuptools"
-                
-                # Web framework detection
-                if 'django' in content:
-                    frameworks_found["web_framework"] = "django"
-                elif 'flask' in content:
-                    frameworks_found["web_framework"] = "flask"
-                elif 'fastapi' in content:
-                    frameworks_found["web_framework"] = "fastapi"
+        # Build tool detection
+        backend = build_system['backend'] or ''
+        if build_system['poetry'] or backend.startswith('poetry'):
+            frameworks_found["build_tool"] = "poetry"
+        elif backend.startswith('hatchling'):
+            frameworks_found["build_tool"] = "hatchling"
+        elif backend.startswith('flit'):
+            frameworks_found["build_tool"] = "flit"
+        elif 'setuptools' in build_system['requires'] or os.path.isfile(os.path.join(repo_path, 'setup.py')):
+            frameworks_found["build_tool"] = "setuptools"
+        
+        # Web framework detection
+        for web_framework in ('django', 'flask', 'fastapi'):
+            if web_framework in names:
+                frameworks_found["web_framework"] = web_framework
+                break
+        
+        frameworks_found["dependency_counts"] = {
+            group: sum(1 for dep in dependencies['dependencies'] if dep['group'] == group)
+            for group in ('runtime', 'dev', 'test')
+        }
+        frameworks_found["manifest_files"] = dependencies['files']
         
         return f"Detected Frameworks:\n{json.dumps(frameworks_found, indent=2)}"
         
     except Exception as e:
         return f"Error detecting frameworks: {str(e)}"
 
+@tool
+@recorded
+def detect_dependency_caching(repo_path: str) -> str:
+    """Detect the package manager from lock/manifest files and return CI cache and install steps keyed on the lockfile"""
+    try:
+        if not os.path.exists(repo_path):
+            return f"Repository path does not exist: {repo_path}"
+
+        plan = detect_package_manager(repo_path)
+
+        result = f"Dependency Caching Plan:\n{json.dumps(plan, indent=2)}"
+        result += f"\n\nWorkflow Steps (use as-is in each job that installs dependencies):\n{render_cache_steps(plan)}"
+        return result
+
+    except Exception as e:
+        return f"Error detecting dependency caching: {str(e)}"
+
+@tool
+@recorded
+def plan_test_shards(repo_path: str) -> str:
+    """Estimate test-suite size (test files, test functions, JUnit durations) and split tests into balanced CI shards"""
+    try:
+        if not os.path.exists(repo_path):
+            return f"Repository path does not exist: {repo_path}"
+
+        suite = estimate_test_suite(repo_path)
+        if not suite['shards']:
+            return f"Test Suite Estimate:\n{json.dumps(suite, indent=2)}\n\nNo test files found, no sharding needed"
+
+        run_prefix = detect_package_manager(repo_path)['run_prefix']
+        result = f"Test Suite Estimate:\n{json.dumps(suite, indent=2)}"
+        result += f"\n\nTest Job Matrix (use as the test job's strategy and test step):\n{render_shard_matrix(suite, run_prefix)}"
+        return result
+
+    except Exception as e:
+        return f"Error planning test shards: {str(e)}"
+
 @tool
 def generate_workflow_yaml(workflow_content: str, filename: str = "workflow.yaml") -> str:
     """Generate and save a YAML workflow file"""
@@ -224,21 +292,25 @@ def cleanup_temp_directory(dir_path: str) -> str:
     except Exception as e:
         return f"Error cleaning up directory: {str(e)}"
 
+# Tasks that only need the analysis and run in parallel after it (see kickoff_fan_out)
+FAN_OUT_TASKS = [
+    'generate_test_build_workflow',
+    'create_deployment_configurations',
+    'create_deployment_documentation',
+]
+
 @CrewBase
 class NewLatte():
     """NewLatte crew"""
     agents: List[BaseAgent]
     tasks: List[Task]
     
-    def __init__(self):
+    def __init__(self, llm=None):
         super().__init__()
-        # Configure Azure OpenAI LLM
-        self.llm = LLM(
-            model="azure/gpt-4o",
-            base_url=os.getenv("AZURE_API_BASE"),
-            api_key=os.getenv("AZURE_API_KEY"),
-            api_version=os.getenv("AZURE_API_VERSION")
-        )
+        # Route LLM calls over the deployments in config/llm_endpoints.yaml
+        # (falls back to the single AZURE_API_BASE deployment). Long-running
+        # callers such as the daemon pass a shared, already warm instance.
+        self.llm = llm or build_llm()
    
     # These agent names MUST match the names in your agents.yaml
     @agent
@@ -249,7 +321,9 @@ class NewLatte():
                 clone_repository,
                 analyze_repository_structure,
                 read_file_content,
-                detect_python_frameworks
+                detect_python_frameworks,
+                detect_dependency_caching,
+                plan_test_shards
             ],
             verbose=True,
             llm=self.llm
@@ -267,6 +341,28 @@ class NewLatte():
             llm=self.llm
         )
 
+    @agent
+    def cloud_deployment_specialist(self) -> Agent:
+        return Agent(
+            config=self.agents_config['cloud_deployment_specialist'],
+            tools=[
+                read_file_content
+            ],
+            verbose=True,
+            llm=self.llm
+        )
+
+    @agent
+    def deployment_documentation_writer(self) -> Agent:
+        return Agent(
+            config=self.agents_config['deployment_documentation_writer'],
+            tools=[
+                read_file_content
+            ],
+            verbose=True,
+            llm=self.llm
+        )
+
     # These task names MUST match the names in your tasks.yaml
     @task
     def analyze_test_build_setup(self) -> Task:
@@ -280,10 +376,24 @@ class NewLatte():
             config=self.tasks_config['generate_test_build_workflow'],
             output_file='workflows.yaml'
         )
+
+    @task
+    def create_deployment_configurations(self) -> Task:
+        return Task(
+            config=self.tasks_config['create_deployment_configurations'],
+            output_file='deployment_config.yaml'
+        )
+
+    @task
+    def create_deployment_documentation(self) -> Task:
+        return Task(
+            config=self.tasks_config['create_deployment_documentation'],
+            output_file='deployment_docs.md'
+        )
    
     @crew
     def crew(self) -> Crew:
-        """Creates the NewLatte crew"""
+        """Creates the NewLatte crew (all tasks in sequence; used by train/test/replay)"""
         return Crew(
             agents=self.agents,
             tasks=self.tasks,
@@ -291,6 +401,76 @@ class NewLatte():
             verbose=True,
         )
 
+    def kickoff_fan_out(self, inputs: dict, step_callback=None):
+        """
+        Run the analysis once, then the generation tasks concurrently.
+
+        crewai's sequential process only lets a crew end with a single async
+        task, so each generation task runs in its own single-task crew on a
+        thread, all sharing the finished analysis task as context. Every
+        branch gets its own NewLatte instance (and therefore its own agents,
+        which are not safe to share across threads) but the same LLM.
+        Returns the workflow generation output.
+
+        Task outputs are recorded under each task's index in ``crew()``
+        afterwards, so ``replay <task_id>`` works as after a sequential run.
+        """
+        analysis = self.analyze_test_build_setup()
+        Crew(
+            agents=[self.test_build_analyst()],
+            tasks=[analysis],
+            process=Process.sequential,
+            verbose=True,
+            step_callback=step_callback,
+        ).kickoff(inputs=inputs)
+
+        def run_branch(task_name: str):
+            branch_task = getattr(NewLatte(llm=self.llm), task_name)()
+            branch_task.context = [analysis]
+            output = Crew(
+                agents=[branch_task.agent],
+                tasks=[branch_task],
+                process=Process.sequential,
+                verbose=True,
+                step_callback=step_callback,
+            ).kickoff(inputs=inputs)
+            return branch_task, output
+
+        with ThreadPoolExecutor(max_workers=len(FAN_OUT_TASKS)) as pool:
+            branches = list(pool.map(run_branch, FAN_OUT_TASKS))
+
+        self._store_task_outputs(inputs, [analysis] + [branch_task for branch_task, _ in branches])
+        return branches[0][1]
+
+    def _store_task_outputs(self, inputs: dict, finished_tasks: List[Task]):
+        """
+        Rewrite crewai's latest-kickoff task outputs for a fan-out run.
+
+        Every crew kickoff resets that shared store and numbers its tasks from
+        0, so the concurrent branch crews wipe the analysis row and leave
+        three rows at index 0. Replay looks tasks up by position in
+        ``crew()``, so each output is stored under its index there.
+        """
+        order = [crew_task.name for crew_task in self.crew().tasks]
+        handler = TaskOutputStorageHandler()
+        handler.reset()
+        for finished in sorted(finished_tasks, key=lambda t: order.index(t.name)):
+            output = finished.output
+            handler.add(
+                finished,
+                {
+                    "description": output.description,
+                    "summary": output.summary,
+                    "raw": output.raw,
+                    "pydantic": output.pydantic,
+                    "json_dict": output.json_dict,
+                    "output_format": output.output_format,
+                    "agent": output.agent,
+                },
+                order.index(finished.name),
+                inputs,
+            )
+
 
 
 
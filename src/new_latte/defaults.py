@@ -0,0 +1,13 @@
+"""
+Daemon address and state defaults shared by the server and the thin client.
+
+Kept free of heavy imports so ``client`` starts without loading crewai.
+"""
+
+import os
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_STATE_DIR = os.path.expanduser("~/.new_latte")
+
+TERMINAL_STATUSES = {"succeeded", "failed", "cancelled"}
@@ -0,0 +1,320 @@
+"""
+Multi-endpoint LLM routing for the NewLatte crew.
+
+A single Azure deployment caps throughput and turns any endpoint failure
+(404, 5xx) into a failed run. ``RoutedLLM`` fronts a pool of deployments,
+each with its own concurrency and tokens-per-minute limits, and dispatches
+every call to the least loaded healthy endpoint. Rate limits (429) are
+retried with exponential backoff; missing deployments and server errors
+open a per-endpoint circuit breaker so traffic fails over to the rest of
+the pool.
+
+A kickoff can be made cancellable with ``RoutedLLM.cancel_on(event)``: once
+the event is set every further call raises ``LLMCallCancelled`` before any
+request is sent, including the calls of crewai's own task retries.
+"""
+
+import contextlib
+import os
+import random
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+import yaml
+from crewai import LLM
+from crewai.llms.base_llm import BaseLLM
+
+from new_latte.cassette import active_cassette
+
+DEFAULT_ENDPOINTS_FILE = Path(__file__).parent / "config" / "llm_endpoints.yaml"
+
+# Status codes that mean "this endpoint is unusable right now, try another one"
+FAILOVER_STATUS_CODES = {404, 500, 502, 503, 504}
+RATE_LIMIT_STATUS_CODE = 429
+
+_ENV_REF = re.compile(r"\$\{(\w+)\}")
+
+
+class NoHealthyEndpointError(RuntimeError):
+    """Raised when every endpoint in the pool is unavailable"""
+
+
+class LLMCallCancelled(RuntimeError):
+    """Raised instead of calling the LLM once the running kickoff was cancelled"""
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    """Extract the HTTP status code from a litellm/openai exception"""
+    code = getattr(error, "status_code", None)
+    if code is None:
+        response = getattr(error, "response", None)
+        code = getattr(response, "status_code", None)
+    try:
+        return int(code) if code is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _estimate_tokens(messages: Union[str, List[Dict[str, str]]]) -> int:
+    """Rough token estimate (~4 characters per token) used for TPM accounting"""
+    if isinstance(messages, str):
+        text = messages
+    else:
+        text = "".join(str(message.get("content", "")) for message in messages)
+    return max(1, len(text) // 4)
+
+
+class Endpoint:
+    """One deployment in the pool with its own limits and health state"""
+
+    def __init__(
+        self,
+        name: str,
+        llm: LLM,
+        weight: float = 1.0,
+        max_concurrency: int = 4,
+        tokens_per_minute: Optional[int] = None,
+        failure_threshold: int = 3,
+        cooldown_seconds: float = 30.0,
+    ):
+        self.name = name
+        self.llm = llm
+        self.weight = max(weight, 0.01)
+        self.max_concurrency = max_concurrency
+        self.tokens_per_minute = tokens_per_minute
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+
+        self.in_flight = 0
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.throttled_until = 0.0
+        self._token_log: List[tuple] = []  # (timestamp, tokens) within the last minute
+
+    def tokens_used(self, now: float) -> int:
+        """Tokens sent to this endpoint over the trailing minute"""
+        self._token_log = [(ts, n) for ts, n in self._token_log if now - ts < 60]
+        return sum(n for _, n in self._token_log)
+
+    def is_available(self, now: float, tokens: int) -> bool:
+        """Whether the endpoint can take a request of ``tokens`` right now"""
+        if now < self.open_until or now < self.throttled_until:
+            return False
+        if self.in_flight >= self.max_concurrency:
+            return False
+        if self.tokens_per_minute and self.tokens_used(now) + tokens > self.tokens_per_minute:
+            return False
+        return True
+
+    def load(self) -> float:
+        """Weighted load; lower is better"""
+        return (self.in_flight + 1) / self.weight
+
+    def record_success(self):
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+
+    def record_failure(self, now: float):
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= self.failure_threshold:
+            self.open_until = now + self.cooldown_seconds
+
+
+class RoutedLLM(BaseLLM):
+    """LLM that spreads calls over a pool of endpoints with failover"""
+
+    def __init__(
+        self,
+        endpoints: List[Endpoint],
+        max_retries: int = 6,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+        acquire_timeout: float = 300.0,
+    ):
+        if not endpoints:
+            raise ValueError("RoutedLLM needs at least one endpoint")
+        super().__init__(model=endpoints[0].llm.model)
+        self.endpoints = endpoints
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.acquire_timeout = acquire_timeout
+        self._condition = threading.Condition()
+        self._cancel_event: Optional[threading.Event] = None
+
+    @contextlib.contextmanager
+    def cancel_on(self, event: threading.Event):
+        """Refuse every call made while ``event`` is set, for the duration of one kickoff"""
+        previous, self._cancel_event = self._cancel_event, event
+        try:
+            yield self
+        finally:
+            self._cancel_event = previous
+
+    def _acquire(self, tokens: int, exclude: set) -> Endpoint:
+        """Block until an endpoint is free, then reserve a slot on it"""
+        deadline = time.monotonic() + self.acquire_timeout
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                candidates = [
+                    endpoint for endpoint in self.endpoints
+                    if endpoint.name not in exclude and endpoint.is_available(now, tokens)
+                ]
+                if candidates:
+                    endpoint = min(candidates, key=lambda e: e.load())
+                    endpoint.in_flight += 1
+                    endpoint._token_log.append((now, tokens))
+                    # crewai's executor writes the ReAct stop words onto this LLM, not the endpoint's
+                    endpoint.llm.stop = list(self.stop or [])
+                    return endpoint
+
+                if all(e.name in exclude or now < e.open_until for e in self.endpoints):
+                    raise NoHealthyEndpointError(
+                        "No healthy LLM endpoint available: "
+                        + ", ".join(e.name for e in self.endpoints)
+                    )
+                if now >= deadline:
+                    raise NoHealthyEndpointError("Timed out waiting for a free LLM endpoint")
+                # Wake up on release or periodically for TPM windows / cooldowns
+                self._condition.wait(timeout=min(1.0, deadline - now))
+
+    def _release(self, endpoint: Endpoint):
+        with self._condition:
+            endpoint.in_flight -= 1
+            self._condition.notify_all()
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return delay * (0.5 + random.random() / 2)  # Jitter to avoid retry storms
+
+    def call(
+        self,
+        messages: Union[str, List[Dict[str, str]]],
+        tools: Optional[List[dict]] = None,
+        callbacks: Optional[List[Any]] = None,
+        available_functions: Optional[Dict[str, Any]] = None,
+    ) -> Union[str, Any]:
+        # crewai retries a failed task from scratch, so a cancelled kickoff is stopped here too
+        if self._cancel_event is not None and self._cancel_event.is_set():
+            raise LLMCallCancelled("LLM call refused: the kickoff was cancelled")
+
+        def route():
+            return self._route(messages, tools, callbacks, available_functions)
+
+        # Record or replay the exchange when a cassette is active
+        cassette = active_cassette()
+        if cassette is not None:
+            return cassette.llm_call(messages, tools, route)
+        return route()
+
+    def _route(
+        self,
+        messages: Union[str, List[Dict[str, str]]],
+        tools: Optional[List[dict]],
+        callbacks: Optional[List[Any]],
+        available_functions: Optional[Dict[str, Any]],
+    ) -> Union[str, Any]:
+        tokens = _estimate_tokens(messages)
+        failed: set = set()
+        last_error: Optional[Exception] = None
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                endpoint = self._acquire(tokens, exclude=failed)
+            except NoHealthyEndpointError:
+                if last_error is not None:
+                    raise last_error
+                raise
+
+            try:
+                result = endpoint.llm.call(
+                    messages,
+                    tools=tools,
+                    callbacks=callbacks,
+                    available_functions=available_functions,
+                )
+            except Exception as e:
+                last_error = e
+                status = _status_code(e)
+                with self._condition:
+                    if status == RATE_LIMIT_STATUS_CODE:
+                        # Park this endpoint; others in the pool can keep serving
+                        endpoint.throttled_until = time.monotonic() + self._backoff(attempt)
+                    elif status in FAILOVER_STATUS_CODES:
+                        endpoint.record_failure(time.monotonic())
+                        failed.add(endpoint.name)
+                    else:
+                        raise
+                continue
+            finally:
+                self._release(endpoint)
+
+            with self._condition:
+                endpoint.record_success()
+            return result
+
+        raise last_error
+
+    def supports_function_calling(self) -> bool:
+        return all(e.llm.supports_function_calling() for e in self.endpoints)
+
+    def supports_stop_words(self) -> bool:
+        return all(e.llm.supports_stop_words() for e in self.endpoints)
+
+    def get_context_window_size(self) -> int:
+        return min(e.llm.get_context_window_size() for e in self.endpoints)
+
+
+def _resolve_env(value: Any) -> Any:
+    """Expand ${VAR} references in string config values"""
+    if isinstance(value, str):
+        return _ENV_REF.sub(lambda match: os.getenv(match.group(1), ""), value)
+    return value
+
+
+def load_endpoints(config_path: Optional[str] = None) -> List[Endpoint]:
+    """Build the endpoint pool from YAML config, falling back to AZURE_* env vars"""
+    path = Path(config_path or os.getenv("LLM_ENDPOINTS_FILE", DEFAULT_ENDPOINTS_FILE))
+
+    entries = []
+    if path.is_file():
+        with open(path, "r", encoding="utf-8") as f:
+            entries = (yaml.safe_load(f) or {}).get("endpoints", [])
+
+    if not entries:
+        entries = [{
+            "name": "azure-default",
+            "model": "azure/gpt-4o",
+            "base_url": "${AZURE_API_BASE}",
+            "api_key": "${AZURE_API_KEY}",
+            "api_version": "${AZURE_API_VERSION}",
+        }]
+
+    endpoints = []
+    for index, entry in enumerate(entries):
+        entry = {key: _resolve_env(value) for key, value in entry.items()}
+        llm = LLM(
+            model=entry["model"],
+            base_url=entry.get("base_url") or None,
+            api_key=entry.get("api_key") or None,
+            api_version=entry.get("api_version") or None,
+        )
+        endpoints.append(Endpoint(
+            name=entry.get("name", f"endpoint-{index}"),
+            llm=llm,
+            weight=float(entry.get("weight", 1.0)),
+            max_concurrency=int(entry.get("max_concurrency", 4)),
+            tokens_per_minute=int(entry["tokens_per_minute"]) if entry.get("tokens_per_minute") else None,
+            failure_threshold=int(entry.get("failure_threshold", 3)),
+            cooldown_seconds=float(entry.get("cooldown_seconds", 30.0)),
+        ))
+    return endpoints
+
+
+def build_llm(config_path: Optional[str] = None) -> RoutedLLM:
+    """Create the routed LLM used by the crew's agents"""
+    return RoutedLLM(load_endpoints(config_path))
@@ -0,0 +1,437 @@
+#!/usr/bin/env python
+"""
+End-to-end load harness for NewLatte kickoffs without a live model.
+
+Three parts:
+
+* a mock OpenAI/Azure-compatible chat completions server with configurable
+  latency, token rate and error injection. It plays a scripted ReAct agent:
+  it calls the analysis tools the prompt offers, then returns a final
+  answer, so tool execution and orchestration are exercised for real;
+* a corpus of small local git repositories of varying size;
+* a driver that runs N kickoffs with a given concurrency, each in its own
+  process and working directory (the crew uses relative paths), and reports
+  p50/p95/p99 kickoff latency, repos per minute, agent iterations and tool
+  calls per repo, and peak memory. Kickoff latency is timed inside the
+  child around the kickoff itself; the whole child process, including
+  interpreter start and the crewai imports the daemon avoids, is reported
+  separately as process latency.
+
+    loadtest run --repos 20 --concurrency 4 --latency 0.3 --error-rate 0.05
+    loadtest mock-server --port 8901 --latency 0.5
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import re
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+# Tools the scripted agent calls, in order, when the prompt offers them
+SCRIPTED_TOOLS = [
+    'clone_repository',
+    'analyze_repository_structure',
+    'detect_python_frameworks',
+    'detect_dependency_caching',
+    'plan_test_shards',
+]
+
+MOCK_WORKFLOW = """name: Test and Build
+on: [push, pull_request]
+jobs:
+  test:
+    runs-on: ubuntu-latest
+    steps:
+      - uses: actions/checkout@v4
+      - run: python -m pytest tests/
+"""
+
+
+# --- Mock LLM server ---
+
+class MockLLMConfig:
+    """Behaviour knobs for the mock server"""
+
+    def __init__(self, latency: float = 0.2, jitter: float = 0.0, tokens_per_second: float = 0.0,
+                 error_rate: float = 0.0, error_codes: Optional[List[int]] = None, seed: Optional[int] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.error_codes = error_codes or [429, 500]
+        self.random = random.Random(seed)
+        self.stats = {'requests': 0, 'errors': 0, 'completion_tokens': 0, 'by_endpoint': {}}
+        self.lock = threading.Lock()
+
+
+def _scripted_reply(messages: List[dict]) -> str:
+    """Next ReAct turn: call the next offered analysis tool, then give a final answer"""
+    system = "\n".join(str(m.get('content', '')) for m in messages if m.get('role') == 'system')
+    prompt = "\n".join(str(m.get('content', '')) for m in messages if m.get('role') == 'user')
+    offered = set(re.findall(r'Tool Name: (\w+)', system + prompt))
+    plan = [name for name in SCRIPTED_TOOLS if name in offered]
+
+    # Count the agent's own action turns; crewai repeats its format instructions (which mention
+    # "Action:" and "Observation:") inside some tool results, so match on how the turn starts
+    done = sum(1 for m in messages
+               if m.get('role') == 'assistant' and str(m.get('content', '')).startswith('Thought:')
+               and '\nAction:' in str(m.get('content', '')))
+    if done < len(plan):
+        tool_name = plan[done]
+        if tool_name == 'clone_repository':
+            match = re.search(r'((?:file|https?)://[^\s"\'`]+)', prompt)
+            url = match.group(1).rstrip('.,)') if match else ''
+            tool_input = {'repo_url': url, 'target_dir': './cloned_repo'}
+        else:
+            tool_input = {'repo_path': './cloned_repo'}
+        return (f"Thought: I should use {tool_name}.\n"
+                f"Action: {tool_name}\n"
+                f"Action Input: {json.dumps(tool_input)}")
+
+    answer = MOCK_WORKFLOW if 'workflow' in prompt.lower() else "analysis: mock result"
+    return f"Thought: I now know the final answer\nFinal Answer: {answer}"
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    """Serves /v1/chat/completions and Azure /openai/deployments/<name>/chat/completions"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, payload: dict):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if status == 429:
+            self.send_header('Retry-After', '1')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        config: MockLLMConfig = self.server.config
+        path = self.path.split('?', 1)[0]
+        if not path.endswith('/chat/completions'):
+            return self._send(404, {'error': {'message': f'Unknown path {path}'}})
+        parts = path.split('/')
+        # Azure paths name the deployment; OpenAI-style paths are prefixed per endpoint
+        endpoint = parts[3] if path.startswith('/openai/deployments/') else parts[1] or 'default'
+
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            request = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            return self._send(400, {'error': {'message': 'Invalid JSON'}})
+
+        with config.lock:
+            config.stats['requests'] += 1
+            by_endpoint = config.stats['by_endpoint'].setdefault(endpoint, {'requests': 0, 'errors': 0})
+            by_endpoint['requests'] += 1
+            inject = config.random.random() < config.error_rate
+            code = config.random.choice(config.error_codes) if inject else None
+            delay = config.latency + config.random.uniform(-config.jitter, config.jitter)
+            if inject:
+                config.stats['errors'] += 1
+                by_endpoint['errors'] += 1
+
+        if code is not None:
+            time.sleep(max(0.0, delay) / 4)
+            return self._send(code, {'error': {'message': f'Injected error {code}', 'code': str(code)}})
+
+        messages = request.get('messages', [])
+        content = _scripted_reply(messages)
+        prompt_tokens = sum(len(str(m.get('content', ''))) for m in messages) // 4
+        completion_tokens = max(1, len(content) // 4)
+        if config.tokens_per_second > 0:
+            delay += completion_tokens / config.tokens_per_second
+        time.sleep(max(0.0, delay))
+
+        with config.lock:
+            config.stats['completion_tokens'] += completion_tokens
+        self._send(200, {
+            'id': f'chatcmpl-{uuid.uuid4().hex[:12]}',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': request.get('model', 'mock'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop',
+            }],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens,
+            },
+        })
+
+
+def start_mock_server(config: MockLLMConfig, host: str = '127.0.0.1', port: int = 0) -> ThreadingHTTPServer:
+    """Start the mock server on a background thread; port 0 picks a free port"""
+    server = ThreadingHTTPServer((host, port), MockLLMHandler)
+    server.daemon_threads = True
+    server.config = config
+    threading.Thread(target=server.serve_forever, name='mock-llm', daemon=True).start()
+    return server
+
+
+def write_endpoints_file(path: str, base_url: str, endpoints: int, max_concurrency: int):
+    """LLM router config with ``endpoints`` deployments, all backed by the mock server"""
+    lines = ['endpoints:']
+    for index in range(endpoints):
+        lines += [
+            f'  - name: mock-{index}',
+            f'    model: openai/mock-{index}',
+            f'    base_url: {base_url}/e{index}/v1',
+            '    api_key: mock',
+            f'    max_concurrency: {max_concurrency}',
+            '    cooldown_seconds: 5',
+        ]
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+
+
+# --- Corpus ---
+
+def build_corpus(root: str, count: int, seed: int = 0) -> List[str]:
+    """Create ``count`` small git repositories of varying size and return their file:// URLs"""
+    rng = random.Random(seed)
+    urls = []
+    git = ['git', '-c', 'user.name=loadtest', '-c', 'user.email=loadtest@localhost']
+    for index in range(count):
+        repo = os.path.join(root, f'repo-{index:04d}')
+        os.makedirs(os.path.join(repo, 'tests'), exist_ok=True)
+        os.makedirs(os.path.join(repo, 'src', f'pkg{index}'), exist_ok=True)
+
+        with open(os.path.join(repo, 'requirements.txt'), 'w') as f:
+            f.write(rng.choice(['flask>=2\n', 'django>=4.2\n', 'fastapi\nuvicorn\n', 'requests\n']))
+        with open(os.path.join(repo, 'requirements-dev.txt'), 'w') as f:
+            f.write('-r requirements.txt\npytest>=7\n' + ('pytest-xdist\n' if index % 2 else ''))
+        with open(os.path.join(repo, 'pyproject.toml'), 'w') as f:
+            f.write(f'[project]\nname = "pkg{index}"\nversion = "0.1.0"\n')
+        with open(os.path.join(repo, 'src', f'pkg{index}', '__init__.py'), 'w') as f:
+            f.write('')
+        for test_index in range(1 + index % 6):
+            with open(os.path.join(repo, 'tests', f'test_module{test_index}.py'), 'w') as f:
+                for case in range(rng.randint(3, 40)):
+                    f.write(f'def test_case_{case}():\n    assert True\n\n')
+
+        subprocess.run(['git', 'init', '-q', repo], check=True)
+        subprocess.run(git + ['-C', repo, 'add', '-A'], check=True)
+        subprocess.run(git + ['-C', repo, 'commit', '-q', '-m', 'corpus'], check=True)
+        urls.append('file://' + os.path.abspath(repo))
+    return urls
+
+
+# --- Driver ---
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def kickoff_child(github_repo_url: str, metrics_path: str):
+    """Run one kickoff in this process and write its metrics as JSON"""
+    from datetime import datetime
+
+    from crewai.agents.parser import AgentAction, AgentFinish
+
+    from new_latte.crew import NewLatte
+
+    counters = {'iterations': 0, 'tool_calls': 0}
+
+    # crewai reports a tool step twice (the ToolResult, then the AgentAction); count agent turns only
+    def on_step(step):
+        if isinstance(step, AgentAction):
+            counters['iterations'] += 1
+            counters['tool_calls'] += 1
+        elif isinstance(step, AgentFinish):
+            counters['iterations'] += 1
+
+    inputs = {'current_year': str(datetime.now().year), 'github_repo_url': github_repo_url}
+    started = time.perf_counter()
+    error = None
+    try:
+        NewLatte().kickoff_fan_out(inputs=inputs, step_callback=on_step)
+    except Exception as e:
+        error = str(e)
+
+    metrics = {
+        'kickoff_seconds': time.perf_counter() - started,
+        'iterations': counters['iterations'],
+        'tool_calls': counters['tool_calls'],
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'error': error,
+    }
+    with open(metrics_path, 'w', encoding='utf-8') as f:
+        json.dump(metrics, f)
+
+
+def _run_one(url: str, workdir: str, env: Dict[str, str], timeout: float) -> dict:
+    os.makedirs(workdir, exist_ok=True)
+    metrics_path = os.path.join(workdir, 'metrics.json')
+    started = time.perf_counter()
+    with open(os.path.join(workdir, 'kickoff.log'), 'w') as log:
+        try:
+            process = subprocess.run(
+                [sys.executable, '-m', 'new_latte.loadtest', 'kickoff', url, '--metrics-out', metrics_path],
+                cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT, timeout=timeout,
+            )
+            returncode = process.returncode
+        except subprocess.TimeoutExpired:
+            returncode = None
+    result = {'url': url, 'process_seconds': time.perf_counter() - started}
+    try:
+        with open(metrics_path, 'r', encoding='utf-8') as f:
+            result.update(json.load(f))
+    except (OSError, ValueError):
+        result['error'] = 'timed out' if returncode is None else f'exited with {returncode}'
+    return result
+
+
+def run_load(urls: List[str], concurrency: int, work_root: str, env: Dict[str, str], timeout: float) -> dict:
+    """Kick off every URL with bounded concurrency and summarize the results"""
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(_run_one, url, os.path.join(work_root, f'run-{index:04d}'), env, timeout)
+                   for index, url in enumerate(urls)]
+        results = [future.result() for future in futures]
+    wall = time.perf_counter() - started
+
+    succeeded = [r for r in results if not r.get('error')]
+
+    def percentiles(key):
+        values = [r[key] for r in succeeded if key in r]
+        return {'p50': percentile(values, 50), 'p95': percentile(values, 95), 'p99': percentile(values, 99)}
+
+    def mean(key):
+        values = [r[key] for r in succeeded if key in r]
+        return round(sum(values) / len(values), 3) if values else None
+
+    # Throughput of the kickoffs themselves: each of the busy slots spends its share of the kickoff time
+    slots = min(concurrency, len(results)) or 1
+    kickoff_busy = sum(r.get('kickoff_seconds', 0) for r in succeeded) / slots
+
+    return {
+        'repos': len(results),
+        'succeeded': len(succeeded),
+        'failed': len(results) - len(succeeded),
+        'concurrency': concurrency,
+        'wall_seconds': round(wall, 2),
+        'repos_per_minute': round(len(succeeded) / kickoff_busy * 60, 2) if kickoff_busy else None,
+        'wall_repos_per_minute': round(len(succeeded) / wall * 60, 2) if wall else None,
+        'kickoff_seconds': percentiles('kickoff_seconds'),
+        'process_seconds': percentiles('process_seconds'),
+        'iterations_per_repo': mean('iterations'),
+        'tool_calls_per_repo': mean('tool_calls'),
+        'peak_rss_mb': max((r.get('peak_rss_mb', 0) for r in succeeded), default=None),
+        'errors': sorted({r['error'] for r in results if r.get('error')}),
+    }
+
+
+def main():
+    """
+    Run the load harness, a standalone mock LLM server, or a single kickoff.
+    """
+    parser = argparse.ArgumentParser(description="NewLatte load harness")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add_mock_options(command):
+        command.add_argument('--latency', type=float, default=0.2, help='Base seconds per LLM response')
+        command.add_argument('--jitter', type=float, default=0.0, help='Uniform +/- seconds on the latency')
+        command.add_argument('--tokens-per-second', type=float, default=0.0, help='Completion token rate (0 = instant)')
+        command.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with an error')
+        command.add_argument('--error-codes', default='429,500', help='Comma-separated status codes to inject')
+        command.add_argument('--seed', type=int)
+
+    run = commands.add_parser('run', help='Run concurrent kickoffs against the mock server')
+    run.add_argument('--repos', type=int, default=10)
+    run.add_argument('--concurrency', type=int, default=4)
+    run.add_argument('--endpoints', type=int, default=2, help='Mock deployments in the router pool')
+    run.add_argument('--endpoint-concurrency', type=int, default=8)
+    run.add_argument('--timeout', type=float, default=600)
+    run.add_argument('--work-dir', help='Keep corpus and run directories here instead of a temp dir')
+    run.add_argument('--output', help='Also write the JSON report to this file')
+    add_mock_options(run)
+
+    mock = commands.add_parser('mock-server', help='Run the mock LLM server in the foreground')
+    mock.add_argument('--host', default='127.0.0.1')
+    mock.add_argument('--port', type=int, default=8901)
+    add_mock_options(mock)
+
+    kickoff = commands.add_parser('kickoff', help=argparse.SUPPRESS)
+    kickoff.add_argument('github_repo_url')
+    kickoff.add_argument('--metrics-out', required=True)
+
+    args = parser.parse_args(sys.argv[1:])
+
+    if args.command == 'kickoff':
+        return kickoff_child(args.github_repo_url, args.metrics_out)
+
+    config = MockLLMConfig(
+        latency=args.latency, jitter=args.jitter, tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate, error_codes=[int(c) for c in args.error_codes.split(',') if c],
+        seed=args.seed,
+    )
+
+    if args.command == 'mock-server':
+        server = start_mock_server(config, args.host, args.port)
+        print(f"Mock LLM server listening on http://{args.host}:{server.server_port}/v1")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            server.shutdown()
+        return
+
+    work_root = args.work_dir or tempfile.mkdtemp(prefix='new_latte_load_')
+    os.makedirs(work_root, exist_ok=True)
+    server = start_mock_server(config)
+    try:
+        endpoints_file = os.path.join(work_root, 'llm_endpoints.yaml')
+        write_endpoints_file(endpoints_file, f'http://127.0.0.1:{server.server_port}',
+                             args.endpoints, args.endpoint_concurrency)
+        urls = build_corpus(os.path.join(work_root, 'corpus'), args.repos, seed=args.seed or 0)
+
+        env = dict(os.environ)
+        env.update({
+            'LLM_ENDPOINTS_FILE': endpoints_file,
+            'OPENAI_API_KEY': 'mock',
+            'CREWAI_DISABLE_TELEMETRY': 'true',
+            'OTEL_SDK_DISABLED': 'true',
+            'NEW_LATTE_CACHE_DIR': os.path.join(work_root, 'cache'),
+        })
+        env.pop('NEW_LATTE_RECORD', None)
+
+        report = run_load(urls, args.concurrency, os.path.join(work_root, 'runs'), env, args.timeout)
+        report['mock_llm'] = config.stats
+        report['work_dir'] = work_root
+    finally:
+        server.shutdown()
+        if not args.work_dir:
+            shutil.rmtree(work_root, ignore_errors=True)
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
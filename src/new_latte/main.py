@@ -1,10 +1,14 @@
 #!/usr/bin/env python
+import os
 import sys
+import tempfile
 import warnings
 
 from datetime import datetime
 
+from new_latte.cassette import Cassette, use_cassette
 from new_latte.crew import NewLatte
+from new_latte.server import working_directory
 
 warnings.filterwarnings("ignore", category=SyntaxWarning, module="pysbd")
 
@@ -29,7 +33,13 @@ def run():
     }
     
     try:
-        NewLatte().crew().kickoff(inputs=inputs)
+        # NEW_LATTE_RECORD=<path> captures tool and LLM I/O into a cassette for replay
+        record_path = os.getenv("NEW_LATTE_RECORD")
+        if record_path:
+            with use_cassette(Cassette(record_path, "record", inputs)):
+                NewLatte().kickoff_fan_out(inputs=inputs)
+        else:
+            NewLatte().kickoff_fan_out(inputs=inputs)
     except Exception as e:
         raise Exception(f"An error occurred while running the crew: {e}")
 
@@ -50,10 +60,26 @@ def train():
 
 def replay():
     """
-    Replay the crew execution from a specific task.
+    Replay the crew execution from a specific task, or re-run recorded
+    cassettes (replay a.cassette b.cassette ...) serving tool calls and
+    unchanged LLM exchanges from the recording. Each cassette runs in a
+    fresh working directory, so one replay's clone and outputs never leak
+    into the next.
     """
     try:
-        NewLatte().crew().replay(task_id=sys.argv[1])
+        if not os.path.isfile(sys.argv[1]):
+            NewLatte().crew().replay(task_id=sys.argv[1])
+            return
+
+        for path in sys.argv[1:]:
+            cassette = Cassette.load(path)
+            workdir = tempfile.mkdtemp(prefix="new_latte_replay_")
+            with working_directory(workdir), use_cassette(cassette):
+                NewLatte().kickoff_fan_out(inputs=cassette.inputs)
+            # Tools swallow exceptions into their output, so a failed re-clone surfaces here
+            if cassette.setup_error:
+                raise RuntimeError(cassette.setup_error)
+            print(f"{path}: {cassette.stats} (outputs in {workdir})")
 
     except Exception as e:
         raise Exception(f"An error occurred while replaying the crew: {e}")
@@ -69,7 +95,22 @@ def test():
     }
     
     try:
-        NewLatte().crew().test(n_iterations=int(sys.argv[1]), eval_llm=sys.argv[2], inputs=inputs)
+        # NEW_LATTE_CASSETTE=<path> serves tool calls and unchanged LLM exchanges from a recording
+        cassette_path = os.getenv("NEW_LATTE_CASSETTE")
+        if cassette_path:
+            cassette = Cassette.load(cassette_path)
+            crew = NewLatte().crew()
+
+            # Every test iteration is a full kickoff; replay each from the start of the cassette
+            def rewind(kickoff_inputs):
+                cassette.rewind()
+                return kickoff_inputs
+
+            crew.before_kickoff_callbacks.append(rewind)
+            with use_cassette(cassette):
+                crew.test(n_iterations=int(sys.argv[1]), eval_llm=sys.argv[2], inputs={**inputs, **cassette.inputs})
+        else:
+            NewLatte().crew().test(n_iterations=int(sys.argv[1]), eval_llm=sys.argv[2], inputs=inputs)
 
     except Exception as e:
         raise Exception(f"An error occurred while testing the crew: {e}")
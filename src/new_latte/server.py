@@ -0,0 +1,346 @@
+#!/usr/bin/env python
+"""
+Long-running NewLatte daemon.
+
+Every ``new_latte`` invocation pays interpreter startup, the crewai/litellm
+imports, LLM construction and cold clone/analysis caches before doing any
+work. ``serve`` pays that once: it keeps the routed LLM (and the HTTP
+clients behind it), the clone mirror store and the analysis caches warm in
+one process and accepts jobs over a local HTTP API, either on localhost or
+on a Unix socket.
+
+API:
+    POST   /jobs            {"github_repo_url": "..."}  -> 202 {"id": ...}
+    GET    /jobs                                        -> list of jobs
+    GET    /jobs/<id>                                   -> job status/result
+    DELETE /jobs/<id>                                   -> cancel the job
+    GET    /health
+
+Jobs run one at a time, each in its own working directory under the state
+directory, because the crew's tools and output files use relative paths.
+A running job is cancelled at its next agent step. When a job finishes its
+clone is removed and only the artifacts are kept; the oldest finished jobs
+beyond ``--retain-jobs`` are forgotten and their directories deleted.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import queue
+import shutil
+import socketserver
+import sys
+import threading
+import time
+import uuid
+import warnings
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+from new_latte.crew import NewLatte
+from new_latte.defaults import DEFAULT_HOST, DEFAULT_PORT, DEFAULT_STATE_DIR, TERMINAL_STATUSES
+from new_latte.llm_router import LLMCallCancelled, build_llm
+
+warnings.filterwarnings("ignore", category=SyntaxWarning, module="pysbd")
+
+# Artifacts the crew writes into the job's working directory
+JOB_ARTIFACTS = ["workflows.yaml", "deployment_config.yaml", "deployment_docs.md"]
+
+DEFAULT_RETAIN_JOBS = 100
+
+
+class JobCancelled(Exception):
+    """Raised from the crew's step callback to stop a cancelled job"""
+
+
+@contextlib.contextmanager
+def working_directory(path: str):
+    """Run the enclosed block with ``path`` (created if needed) as the working directory"""
+    cwd = os.getcwd()
+    try:
+        os.makedirs(path, exist_ok=True)
+        os.chdir(path)
+        yield path
+    finally:
+        os.chdir(cwd)
+
+
+def kickoff_in_workdir(llm, github_repo_url: str, workdir: str, cancel_event: Optional[threading.Event] = None) -> str:
+    """
+    Run one crew kickoff with ``workdir`` as the working directory.
+
+    The crew's tools and output files use relative paths, so callers must
+    not run two kickoffs in the same process concurrently. Raises
+    JobCancelled at the next agent step or LLM call once ``cancel_event``
+    is set.
+    """
+    def check_cancelled(_step):
+        if cancel_event is not None and cancel_event.is_set():
+            raise JobCancelled(f"Kickoff for {github_repo_url} cancelled")
+
+    inputs = {
+        'current_year': str(datetime.now().year),
+        'github_repo_url': github_repo_url
+    }
+
+    # crewai retries a task that raised, so the step callback alone would let the retries reach the LLM
+    cancellable = llm.cancel_on(cancel_event) if cancel_event is not None else contextlib.nullcontext()
+    try:
+        with working_directory(workdir), cancellable:
+            return str(NewLatte(llm=llm).kickoff_fan_out(inputs=inputs, step_callback=check_cancelled))
+    except LLMCallCancelled as e:
+        raise JobCancelled(f"Kickoff for {github_repo_url} cancelled") from e
+
+
+class Job:
+    """A single kickoff request and its lifecycle"""
+
+    def __init__(self, github_repo_url: str, jobs_dir: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.github_repo_url = github_repo_url
+        self.workdir = os.path.join(jobs_dir, self.id)
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Optional[str] = None
+        self.error: Optional[str] = None
+        self.cancel_requested = threading.Event()
+
+    def to_dict(self) -> dict:
+        artifacts = {}
+        if self.status == "succeeded":
+            for name in JOB_ARTIFACTS:
+                path = os.path.join(self.workdir, name)
+                if os.path.isfile(path):
+                    artifacts[name] = path
+        return {
+            "id": self.id,
+            "github_repo_url": self.github_repo_url,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "workdir": self.workdir,
+            "artifacts": artifacts,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobManager:
+    """Queues jobs and runs them on a single worker with warm shared state"""
+
+    def __init__(self, state_dir: str, retain_jobs: int = DEFAULT_RETAIN_JOBS):
+        self.state_dir = os.path.abspath(state_dir)
+        self.retain_jobs = retain_jobs
+        self.jobs_dir = os.path.join(self.state_dir, "jobs")
+        os.makedirs(self.jobs_dir, exist_ok=True)
+
+        # Warm state shared by every job
+        os.environ.setdefault("NEW_LATTE_MIRROR_DIR", os.path.join(self.state_dir, "mirrors"))
+        self.llm = build_llm()
+
+        self.jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[Optional[Job]]" = queue.Queue()
+        self._worker = threading.Thread(target=self._work, name="new-latte-worker", daemon=True)
+        self._worker.start()
+
+    def submit(self, github_repo_url: str) -> Job:
+        job = Job(github_repo_url, self.jobs_dir)
+        with self._lock:
+            self.jobs[job.id] = job
+        self._queue.put(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def list(self) -> list:
+        with self._lock:
+            return sorted(self.jobs.values(), key=lambda job: job.created_at)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job.cancel_requested.set()
+        with self._lock:
+            if job.status == "queued":
+                job.status = "cancelled"
+                job.finished_at = time.time()
+        return job
+
+    def shutdown(self):
+        self._queue.put(None)
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            with self._lock:
+                if job.status != "queued":
+                    continue
+                job.status = "running"
+                job.started_at = time.time()
+            self._run(job)
+            self._prune()
+
+    def _run(self, job: Job):
+        status, result, error = "succeeded", None, None
+        try:
+            result = kickoff_in_workdir(self.llm, job.github_repo_url, job.workdir, job.cancel_requested)
+        except JobCancelled:
+            status = "cancelled"
+        except Exception as e:
+            status, error = "failed", f"An error occurred while running the crew: {e}"
+
+        with self._lock:
+            job.status = status
+            job.result = result
+            job.error = error
+            job.finished_at = time.time()
+
+        # The clone is only needed while the crew runs; keep just the artifact files
+        if os.path.isdir(job.workdir):
+            for entry in os.scandir(job.workdir):
+                if entry.is_dir(follow_symlinks=False):
+                    shutil.rmtree(entry.path, ignore_errors=True)
+
+    def _prune(self):
+        """Forget the oldest finished jobs beyond ``retain_jobs`` and delete their directories"""
+        with self._lock:
+            finished = sorted(
+                (job for job in self.jobs.values() if job.status in TERMINAL_STATUSES),
+                key=lambda job: job.finished_at or job.created_at,
+            )
+            expired = finished[:max(0, len(finished) - self.retain_jobs)]
+            for job in expired:
+                del self.jobs[job.id]
+        for job in expired:
+            shutil.rmtree(job.workdir, ignore_errors=True)
+
+
+class JobRequestHandler(BaseHTTPRequestHandler):
+    """JSON API over the JobManager attached to the server"""
+
+    server_version = "NewLatte/0.1"
+
+    @property
+    def manager(self) -> JobManager:
+        return self.server.manager
+
+    def address_string(self):
+        # Unix socket peers have no (host, port) address
+        if isinstance(self.client_address, tuple):
+            return super().address_string()
+        return "unix"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, status: int, payload):
+        body = json.dumps(payload, indent=2).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _job_id(self) -> Optional[str]:
+        parts = self.path.strip("/").split("/")
+        if len(parts) == 2 and parts[0] == "jobs":
+            return parts[1]
+        return None
+
+    def do_GET(self):
+        if self.path == "/health":
+            return self._send(200, {"status": "ok"})
+        if self.path.rstrip("/") == "/jobs":
+            return self._send(200, [job.to_dict() for job in self.manager.list()])
+
+        job_id = self._job_id()
+        job = self.manager.get(job_id) if job_id else None
+        if job is None:
+            return self._send(404, {"error": "Job not found"})
+        self._send(200, job.to_dict())
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/jobs":
+            return self._send(404, {"error": "Not found"})
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            github_repo_url = payload["github_repo_url"].strip()
+        except (ValueError, KeyError, AttributeError):
+            return self._send(400, {"error": "Expected JSON body with 'github_repo_url'"})
+
+        job = self.manager.submit(github_repo_url)
+        self._send(202, job.to_dict())
+
+    def do_DELETE(self):
+        job_id = self._job_id()
+        job = self.manager.cancel(job_id) if job_id else None
+        if job is None:
+            return self._send(404, {"error": "Job not found"})
+        self._send(202, job.to_dict())
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """HTTP server bound to a Unix domain socket"""
+
+    daemon_threads = True
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+        super().server_bind()
+        os.chmod(self.server_address, 0o600)
+        self.server_name = "localhost"
+        self.server_port = 0
+
+
+def serve():
+    """
+    Run the NewLatte daemon.
+    """
+    parser = argparse.ArgumentParser(description="Run the NewLatte analysis daemon")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--socket", help="Listen on this Unix socket instead of TCP")
+    parser.add_argument("--state-dir", default=os.getenv("NEW_LATTE_STATE_DIR", DEFAULT_STATE_DIR))
+    parser.add_argument("--retain-jobs", type=int, default=DEFAULT_RETAIN_JOBS,
+                        help="Finished jobs to keep (with their artifacts) before the oldest are deleted")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args(sys.argv[1:])
+
+    manager = JobManager(args.state_dir, retain_jobs=args.retain_jobs)
+    if args.socket:
+        server = UnixHTTPServer(args.socket, JobRequestHandler)
+        where = args.socket
+    else:
+        server = ThreadingHTTPServer((args.host, args.port), JobRequestHandler)
+        where = f"http://{args.host}:{args.port}"
+    server.manager = manager
+    server.verbose = args.verbose
+
+    print(f"NewLatte daemon listening on {where}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        manager.shutdown()
+        server.server_close()
+        if args.socket and os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+
+if __name__ == "__main__":
+    serve()
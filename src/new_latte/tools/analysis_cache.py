@@ -0,0 +1,109 @@
+"""
+In-process memoization of repository analysis results.
+
+Analysis helpers are pure functions of the checked-out tree, so results are
+cached per (function, HEAD commit, arguments). The commit identifies the
+tree, so the same revision checked out into different directories (the
+daemon clones into a fresh directory per job) shares entries. Trees that
+are not clean git checkouts are never cached. The cache lives as long as
+the process, which makes it pay off in the long-running daemon.
+"""
+
+import functools
+import os
+import subprocess
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+MAX_ENTRIES = 512
+
+_cache: "OrderedDict[tuple, object]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+# Revisions resolved by the outermost cached call on this thread, reused by nested ones
+_local = threading.local()
+
+
+def _read_head(repo_path: str) -> Optional[str]:
+    """Resolve HEAD from the .git directory without spawning git"""
+    git_dir = os.path.join(repo_path, '.git')
+    try:
+        with open(os.path.join(git_dir, 'HEAD'), 'r') as f:
+            head = f.read().strip()
+        if not head.startswith('ref: '):
+            return head or None
+
+        ref = head[len('ref: '):]
+        ref_path = os.path.join(git_dir, ref)
+        if os.path.isfile(ref_path):
+            with open(ref_path, 'r') as f:
+                return f.read().strip() or None
+        with open(os.path.join(git_dir, 'packed-refs'), 'r') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 2 and parts[1] == ref:
+                    return parts[0]
+    except OSError:
+        pass
+    return None
+
+
+def repository_revision(repo_path: str) -> Optional[str]:
+    """HEAD commit of a checkout, or None if it is not a clean git checkout"""
+    head = _read_head(repo_path)
+    if head is None:
+        return None
+    try:
+        status = subprocess.run(
+            ['git', '-C', repo_path, 'status', '--porcelain', '--untracked-files=normal'],
+            capture_output=True, text=True, timeout=30
+        )
+        if status.returncode != 0 or status.stdout.strip():
+            return None
+        return head
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+
+
+def revision_cached(fn: Callable) -> Callable:
+    """Memoize ``fn(repo_path, ...)`` by the repository's HEAD commit (results must not be mutated)"""
+    @functools.wraps(fn)
+    def wrapper(repo_path: str, *args, **kwargs):
+        revisions = getattr(_local, 'revisions', None)
+        outermost = revisions is None
+        if outermost:
+            revisions = _local.revisions = {}
+        try:
+            path = os.path.abspath(repo_path)
+            if path not in revisions:
+                revisions[path] = repository_revision(repo_path)
+            return _cached_call(fn, revisions[path], repo_path, args, kwargs)
+        finally:
+            if outermost:
+                _local.revisions = None
+
+    return wrapper
+
+
+def _cached_call(fn: Callable, revision: Optional[str], repo_path: str, args: tuple, kwargs: dict):
+    if revision is None:
+        return fn(repo_path, *args, **kwargs)
+
+    key = (fn.__module__, fn.__qualname__, revision, args, tuple(sorted(kwargs.items())))
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    result = fn(repo_path, *args, **kwargs)
+    with _cache_lock:
+        _cache[key] = result
+        while len(_cache) > MAX_ENTRIES:
+            _cache.popitem(last=False)
+    return result
+
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
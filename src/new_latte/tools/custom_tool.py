@@ -1,6 +1,9 @@
 from langchain.tools import BaseTool
 from typing import Optional
 from .repository_cloner import clone_and_analyze_repository
+from .dependency_cache import detect_package_manager
+from .manifest_parser import extract_dependencies
+from .test_sharding import estimate_test_suite
 
 
 class RepositoryCloneTool(BaseTool):
@@ -179,6 +182,12 @@ class RepositoryAnalyzerTool(BaseTool):
         if os.path.exists(os.path.join(repo_path, 'poetry.lock')):
             dependencies['poetry_lock'] = 'poetry.lock'
         
+        # Normalized runtime/dev/test dependency set from all manifests
+        dependencies['parsed'] = extract_dependencies(repo_path)
+        
+        # Package manager and lockfile-keyed CI cache plan
+        dependencies['caching'] = detect_package_manager(repo_path)
+        
         return dependencies
     
     def _analyze_testing(self, repo_path: str) -> dict:
@@ -219,6 +228,9 @@ class RepositoryAnalyzerTool(BaseTool):
         if testing['test_files'] or testing['test_directories']:
             testing['framework'] = 'pytest'  # Default to pytest
         
+        # Suite size, weights and balanced shards for parallel CI jobs
+        testing['suite'] = estimate_test_suite(repo_path)
+        
         return testing
     
     def _analyze_build(self, repo_path: str) -> dict:
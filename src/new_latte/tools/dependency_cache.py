@@ -0,0 +1,163 @@
+"""
+Package manager detection and CI dependency-cache planning.
+
+Looks at the lock/manifest files in a repository, picks the package manager
+they belong to and produces the GitHub Actions setup, cache and install
+steps for it, keyed on the lockfile hash so CI runs only reinstall when
+dependencies actually change.
+"""
+
+import json
+import os
+from typing import Optional
+
+from .manifest_parser import extract_dependencies
+
+try:
+    import tomllib
+except ImportError:  # Python 3.10
+    import tomli as tomllib
+
+
+# Checked in order: the first lockfile found decides the package manager
+LOCKFILE_MANAGERS = [
+    ('uv.lock', 'uv'),
+    ('poetry.lock', 'poetry'),
+    ('Pipfile.lock', 'pipenv'),
+]
+
+INSTALL_COMMANDS = {
+    'uv': 'uv sync --frozen --all-extras',
+    'poetry': 'poetry install --no-interaction',
+    'pipenv': 'pipenv sync --dev',
+}
+
+RUN_PREFIXES = {
+    'uv': 'uv run ',
+    'poetry': 'poetry run ',
+    'pipenv': 'pipenv run ',
+    'pip': '',
+}
+
+
+def _read_toml(path: str) -> dict:
+    try:
+        with open(path, 'rb') as f:
+            return tomllib.load(f)
+    except (OSError, tomllib.TOMLDecodeError):
+        return {}
+
+
+def _lockfile_python_version(repo_path: str, manager: str, lockfile: str) -> Optional[str]:
+    """Pull the Python version constraint recorded in the lockfile, if any"""
+    path = os.path.join(repo_path, lockfile)
+    if manager == 'uv':
+        return _read_toml(path).get('requires-python')
+    if manager == 'poetry':
+        return _read_toml(path).get('metadata', {}).get('python-versions')
+    if manager == 'pipenv':
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                meta = json.load(f).get('_meta', {})
+        except (OSError, ValueError):
+            return None
+        return meta.get('requires', {}).get('python_version')
+    return None
+
+
+def detect_package_manager(repo_path: str) -> dict:
+    """
+    Work out how a repository installs its dependencies and how CI should cache them
+
+    Returns a plan with the package manager, the files the cache key is
+    derived from, the setup-python cache type and the install command.
+    """
+    plan = {
+        'package_manager': 'pip',
+        'lockfile': None,
+        'cache_dependency_path': [],
+        'setup_python_cache': 'pip',
+        'install_command': None,
+        'run_prefix': '',
+        'python_version_constraint': None,
+    }
+
+    for lockfile, manager in LOCKFILE_MANAGERS:
+        if os.path.isfile(os.path.join(repo_path, lockfile)):
+            plan['package_manager'] = manager
+            plan['lockfile'] = lockfile
+            plan['cache_dependency_path'] = [lockfile]
+            plan['install_command'] = INSTALL_COMMANDS[manager]
+            plan['python_version_constraint'] = _lockfile_python_version(repo_path, manager, lockfile)
+            break
+    else:
+        dependencies = extract_dependencies(repo_path)
+        roots = dependencies['requirements_roots']
+        manifests = [name for name in ('pyproject.toml', 'setup.py', 'setup.cfg')
+                     if os.path.isfile(os.path.join(repo_path, name))]
+        installable = any(name in manifests for name in ('pyproject.toml', 'setup.py'))
+
+        if roots:
+            # Key on every file pip reads (includes and constraints too), install only the top-level ones
+            plan['cache_dependency_path'] = [
+                path for path in dependencies['requirements_files']
+                if os.path.dirname(path) in ('', 'requirements') or path in dependencies['requirements_includes']
+            ]
+            install = ['python -m pip install'] + [f'-r {path}' for path in roots]
+            if installable:
+                # Tests import the project itself, not just its requirements
+                plan['cache_dependency_path'] += manifests
+                install.append('-e .')
+            plan['install_command'] = ' '.join(install)
+        elif installable:
+            plan['cache_dependency_path'] = manifests
+            plan['install_command'] = 'python -m pip install .'
+        else:
+            plan['setup_python_cache'] = None
+
+    manager = plan['package_manager']
+    if manager == 'uv':
+        # setup-uv caches its own store keyed on uv.lock
+        plan['setup_python_cache'] = None
+    elif manager in ('poetry', 'pipenv'):
+        plan['setup_python_cache'] = manager
+    plan['run_prefix'] = RUN_PREFIXES[manager]
+
+    return plan
+
+
+def render_cache_steps(plan: dict, python_version: str = '${{ matrix.python-version }}') -> str:
+    """Render the setup/cache/install steps for a plan as a GitHub Actions YAML snippet"""
+    manager = plan['package_manager']
+    cache_paths = '\n'.join(f'      {path}' for path in plan['cache_dependency_path'])
+    steps = []
+
+    if manager == 'uv':
+        steps.append(
+            '- uses: astral-sh/setup-uv@v6\n'
+            '  with:\n'
+            '    enable-cache: true\n'
+            f'    cache-dependency-glob: {plan["lockfile"]}\n'
+            f'    python-version: {python_version}'
+        )
+    else:
+        if manager == 'poetry':
+            # setup-python needs poetry on PATH to resolve its cache directory
+            steps.append('- run: pipx install poetry')
+        setup = (
+            '- uses: actions/setup-python@v5\n'
+            '  with:\n'
+            f'    python-version: {python_version}'
+        )
+        if plan['setup_python_cache']:
+            setup += f'\n    cache: {plan["setup_python_cache"]}'
+            if cache_paths:
+                setup += '\n    cache-dependency-path: |\n' + cache_paths
+        steps.append(setup)
+        if manager == 'pipenv':
+            steps.append('- run: python -m pip install pipenv')
+
+    if plan['install_command']:
+        steps.append(f'- name: Install dependencies\n  run: {plan["install_command"]}')
+
+    return '\n'.join(steps)
@@ -0,0 +1,385 @@
+"""
+Normalized dependency extraction from Python manifests and lockfiles.
+
+Parses requirements files (following ``-r``/``-c`` includes), pyproject.toml
+(``[project]``, optional-dependencies, PEP 735 dependency groups, Poetry
+dependencies and groups), Pipfile and the uv/poetry/Pipfile lockfiles into
+one deduplicated dependency set. Each dependency carries its normalized
+name, specifier, extras, environment marker and whether it is a runtime,
+dev or test dependency; lockfiles contribute the resolved versions.
+
+Per-file parse results are memoized by content hash, in process (bounded
+LRU) and on disk under ``NEW_LATTE_CACHE_DIR`` (default
+``~/.cache/new_latte``), so re-analysing an unchanged repository does not
+re-parse anything. The merged set is memoized per commit, so the tools that
+each need it share one tree walk per checkout.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shlex
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from packaging.requirements import InvalidRequirement, Requirement
+
+from .analysis_cache import revision_cached
+
+try:
+    import tomllib
+except ImportError:  # Python 3.10
+    import tomli as tomllib
+
+# Bump when the per-file output format changes to invalidate the disk cache
+PARSER_VERSION = 1
+
+SKIP_DIRS = {'.git', '.venv', 'venv', 'env', '.tox', '.nox', 'node_modules', 'site-packages', '__pycache__'}
+
+ROOT_MANIFESTS = ['pyproject.toml', 'Pipfile', 'uv.lock', 'poetry.lock', 'Pipfile.lock']
+
+TEST_HINTS = ('test', 'tests', 'testing', 'ci')
+DEV_HINTS = ('dev', 'develop', 'lint', 'docs', 'doc', 'typing', 'style')
+
+MAX_MEMORY_ENTRIES = 2048
+
+_memory_cache: "OrderedDict[str, dict]" = OrderedDict()
+_memory_cache_lock = threading.Lock()
+
+
+def normalize_name(name: str) -> str:
+    """PEP 503 normalized project name"""
+    return re.sub(r'[-_.]+', '-', name).lower()
+
+
+def classify_group(label: str, default: str = 'runtime') -> str:
+    """Map a file name or group/extra name onto runtime/dev/test"""
+    tokens = set(re.split(r'[^a-z0-9]+', label.lower()))
+    if tokens & set(TEST_HINTS):
+        return 'test'
+    if tokens & set(DEV_HINTS):
+        return 'dev'
+    return default
+
+
+def _requirement(text: str, group: str, source: str, extra: Optional[str] = None) -> Optional[dict]:
+    """Parse one PEP 508 requirement string"""
+    try:
+        req = Requirement(text)
+    except InvalidRequirement:
+        return None
+    return {
+        'name': normalize_name(req.name),
+        'specifier': str(req.specifier),
+        'extras': sorted(req.extras),
+        'marker': str(req.marker) if req.marker else None,
+        'group': group,
+        'extra': extra,
+        'source': source,
+    }
+
+
+# --- Per-file parsers; each returns {'dependencies': [...], 'includes': [...], ...} ---
+
+def _parse_requirements(content: str, rel_path: str) -> dict:
+    group = classify_group(os.path.basename(rel_path))
+    base_dir = os.path.dirname(rel_path)
+    result = {'dependencies': [], 'includes': [], 'constraint_files': []}
+
+    # Join backslash continuations, then drop comments
+    logical = re.sub(r'\\\r?\n', ' ', content)
+    for raw_line in logical.splitlines():
+        line = re.sub(r'(^|\s)#.*$', '', raw_line).strip()
+        if not line:
+            continue
+
+        if line.startswith('-'):
+            try:
+                parts = shlex.split(line)
+            except ValueError:
+                continue
+            option, value = parts[0], (parts[1] if len(parts) > 1 else '')
+            if '=' in option:
+                option, value = option.split('=', 1)
+            if option in ('-r', '--requirement') and value:
+                result['includes'].append(os.path.normpath(os.path.join(base_dir, value)).replace(os.sep, '/'))
+            elif option in ('-c', '--constraint') and value:
+                result['constraint_files'].append(os.path.normpath(os.path.join(base_dir, value)).replace(os.sep, '/'))
+            elif option in ('-e', '--editable') and value:
+                match = re.search(r'#egg=([A-Za-z0-9_.\-\[\],]+)', value)
+                if match:
+                    dep = _requirement(match.group(1), group, rel_path)
+                    if dep:
+                        result['dependencies'].append(dep)
+            continue  # Index/options lines (--index-url, --hash, ...) are not dependencies
+
+        # Per-requirement options such as --hash trail the requirement itself
+        requirement = re.split(r'\s+--', line, maxsplit=1)[0]
+        dep = _requirement(requirement, group, rel_path)
+        if dep:
+            result['dependencies'].append(dep)
+
+    return result
+
+
+def _poetry_requirement(name: str, spec, group: str, source: str) -> Optional[dict]:
+    """Poetry table entries: "^1.2", {version=..., extras=[...], markers=...} or a list of those"""
+    if normalize_name(name) == 'python':
+        return None
+    if isinstance(spec, list):
+        spec = spec[0] if spec else '*'
+    if isinstance(spec, str):
+        spec = {'version': spec}
+    version = spec.get('version', '*')
+    return {
+        'name': normalize_name(name),
+        'specifier': '' if version == '*' else version,
+        'extras': sorted(spec.get('extras', [])),
+        'marker': spec.get('markers'),
+        'group': group,
+        'extra': None,
+        'source': source,
+    }
+
+
+def _parse_pyproject(content: str, rel_path: str) -> dict:
+    data = tomllib.loads(content)
+    result = {'dependencies': [], 'includes': [], 'build_requires': [], 'build_backend': None}
+
+    build = data.get('build-system', {})
+    result['build_backend'] = build.get('build-backend')
+    for text in build.get('requires', []):
+        dep = _requirement(text, 'dev', rel_path)
+        if dep:
+            result['build_requires'].append(dep['name'])
+
+    project = data.get('project', {})
+    for text in project.get('dependencies', []):
+        dep = _requirement(text, 'runtime', rel_path)
+        if dep:
+            result['dependencies'].append(dep)
+    for extra, requirements in project.get('optional-dependencies', {}).items():
+        group = classify_group(extra)
+        for text in requirements:
+            dep = _requirement(text, group, rel_path, extra=extra)
+            if dep:
+                result['dependencies'].append(dep)
+
+    # PEP 735 dependency groups (used by uv)
+    for name, requirements in data.get('dependency-groups', {}).items():
+        group = classify_group(name, default='dev')
+        for text in requirements:
+            if isinstance(text, str):
+                dep = _requirement(text, group, rel_path)
+                if dep:
+                    result['dependencies'].append(dep)
+
+    tool = data.get('tool', {})
+    uv = tool.get('uv', {})
+    for text in uv.get('dev-dependencies', []):
+        dep = _requirement(text, 'dev', rel_path)
+        if dep:
+            result['dependencies'].append(dep)
+
+    poetry = tool.get('poetry', {})
+    result['poetry'] = bool(poetry)
+    sections = [(poetry.get('dependencies', {}), 'runtime'), (poetry.get('dev-dependencies', {}), 'dev')]
+    for name, group_table in poetry.get('group', {}).items():
+        sections.append((group_table.get('dependencies', {}), classify_group(name, default='dev')))
+    for table, group in sections:
+        for name, spec in table.items():
+            dep = _poetry_requirement(name, spec, group, rel_path)
+            if dep:
+                result['dependencies'].append(dep)
+
+    return result
+
+
+def _parse_pipfile(content: str, rel_path: str) -> dict:
+    # Pipfile entries share Poetry's "spec or table" shape
+    data = tomllib.loads(content)
+    result = {'dependencies': [], 'includes': []}
+    for section, group in (('packages', 'runtime'), ('dev-packages', 'dev')):
+        for name, spec in data.get(section, {}).items():
+            dep = _poetry_requirement(name, spec, group, rel_path)
+            if dep:
+                result['dependencies'].append(dep)
+    return result
+
+
+def _parse_lockfile(content: str, rel_path: str) -> dict:
+    """Resolved versions from uv.lock / poetry.lock / Pipfile.lock"""
+    locked = {}
+    if rel_path.endswith('Pipfile.lock'):
+        data = json.loads(content)
+        for section in ('default', 'develop'):
+            for name, entry in data.get(section, {}).items():
+                version = entry.get('version', '')
+                locked[normalize_name(name)] = version.lstrip('=')
+    else:
+        data = tomllib.loads(content)
+        for package in data.get('package', []):
+            if 'name' in package and 'version' in package:
+                locked[normalize_name(package['name'])] = package['version']
+    return {'dependencies': [], 'includes': [], 'locked': locked}
+
+
+def _parser_for(rel_path: str):
+    name = os.path.basename(rel_path)
+    if name == 'pyproject.toml':
+        return _parse_pyproject
+    if name == 'Pipfile':
+        return _parse_pipfile
+    if name in ('uv.lock', 'poetry.lock', 'Pipfile.lock'):
+        return _parse_lockfile
+    return _parse_requirements
+
+
+def _cache_dir() -> str:
+    return os.path.join(os.getenv('NEW_LATTE_CACHE_DIR', os.path.expanduser('~/.cache/new_latte')), 'manifests')
+
+
+def parse_manifest(repo_path: str, rel_path: str) -> Optional[dict]:
+    """Parse one manifest file, memoized by (parser version, path, content hash)"""
+    try:
+        with open(os.path.join(repo_path, rel_path), 'rb') as f:
+            raw = f.read()
+    except OSError:
+        return None
+
+    digest = hashlib.sha256(f"{PARSER_VERSION}:{rel_path}:".encode('utf-8') + raw).hexdigest()
+    with _memory_cache_lock:
+        if digest in _memory_cache:
+            _memory_cache.move_to_end(digest)
+            return _memory_cache[digest]
+
+    cache_path = os.path.join(_cache_dir(), f"{digest}.json")
+    parsed = None
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            parsed = json.load(f)
+    except (OSError, ValueError):
+        pass
+
+    if parsed is None:
+        try:
+            parsed = _parser_for(rel_path)(raw.decode('utf-8', errors='ignore'), rel_path)
+        except (ValueError, tomllib.TOMLDecodeError) as e:
+            parsed = {'dependencies': [], 'includes': [], 'error': str(e)}
+        try:
+            os.makedirs(_cache_dir(), exist_ok=True)
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(parsed, f)
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            pass  # The disk cache is best-effort
+
+    with _memory_cache_lock:
+        _memory_cache[digest] = parsed
+        while len(_memory_cache) > MAX_MEMORY_ENTRIES:
+            _memory_cache.popitem(last=False)
+    return parsed
+
+
+def find_manifests(repo_path: str) -> List[str]:
+    """Root manifests plus every requirements*.txt / requirements/*.txt in the tree"""
+    found = [name for name in ROOT_MANIFESTS if os.path.isfile(os.path.join(repo_path, name))]
+    for root, dirs, files in os.walk(repo_path):
+        dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+        in_requirements_dir = os.path.basename(root) == 'requirements'
+        for file in files:
+            if file.endswith('.txt') and (file.startswith('requirements') or in_requirements_dir):
+                rel_path = os.path.relpath(os.path.join(root, file), repo_path)
+                found.append(rel_path.replace(os.sep, '/'))
+    return sorted(set(found), key=lambda path: (path.count('/'), path))
+
+
+def _inside_repo(repo_root: str, rel_path: str) -> bool:
+    """Whether a manifest path stays within the repository once '..' and symlinks are resolved"""
+    path = os.path.realpath(os.path.join(repo_root, rel_path))
+    return os.path.commonpath([repo_root, path]) == repo_root
+
+
+@revision_cached
+def extract_dependencies(repo_path: str) -> dict:
+    """
+    Build the normalized dependency set for a repository
+
+    Returns the deduplicated dependencies (sorted by name), the resolved
+    versions from lockfiles, the requirements include graph (so callers can
+    tell top-level files from included ones) and the build system.
+    """
+    manifests = find_manifests(repo_path)
+    parsed_files: Dict[str, dict] = {}
+    repo_root = os.path.realpath(repo_path)
+    # Absolute (-r /etc/...), parent-relative and symlinked paths must not leak into results or cache keys
+    outside = set()
+
+    # Follow -r/-c includes even when they point outside the usual file names
+    pending = list(manifests)
+    while pending:
+        rel_path = pending.pop(0)
+        if rel_path in parsed_files or rel_path in outside:
+            continue
+        if not _inside_repo(repo_root, rel_path):
+            outside.add(rel_path)
+            continue
+        parsed = parse_manifest(repo_path, rel_path)
+        if parsed is None:
+            continue
+        parsed_files[rel_path] = parsed
+        pending.extend(parsed.get('includes', []) + parsed.get('constraint_files', []))
+
+    constraint_files = {path for parsed in parsed_files.values() for path in parsed.get('constraint_files', [])
+                        if path not in outside}
+    included = {path for parsed in parsed_files.values() for path in parsed.get('includes', [])
+                if path not in outside}
+
+    merged: Dict[tuple, dict] = {}
+    locked: Dict[str, str] = {}
+    build = {'backend': None, 'requires': [], 'poetry': False}
+    for rel_path, parsed in parsed_files.items():
+        locked.update(parsed.get('locked', {}))
+        if os.path.basename(rel_path) == 'pyproject.toml' and '/' not in rel_path:
+            build = {'backend': parsed.get('build_backend'), 'requires': parsed.get('build_requires', []),
+                     'poetry': parsed.get('poetry', False)}
+        if rel_path in constraint_files:
+            continue  # Constraints pin versions but do not add dependencies
+        for dep in parsed['dependencies']:
+            key = (dep['name'], dep['marker'], tuple(dep['extras']), dep['group'])
+            entry = merged.setdefault(key, {**dep, 'sources': []})
+            if dep['specifier'] and not entry['specifier']:
+                entry['specifier'] = dep['specifier']
+            if dep['source'] not in entry['sources']:
+                entry['sources'].append(dep['source'])
+
+    dependencies = []
+    for entry in sorted(merged.values(), key=lambda d: (d['name'], d['group'], d['marker'] or '')):
+        entry.pop('source', None)
+        entry['locked_version'] = locked.get(entry['name'])
+        dependencies.append(entry)
+
+    requirements_files = [path for path in parsed_files if _parser_for(path) is _parse_requirements]
+    # Top-level files are the ones nothing else includes; nested subprojects don't count
+    roots = [path for path in requirements_files
+             if path not in included and path not in constraint_files
+             and os.path.dirname(path) in ('', 'requirements')]
+    return {
+        'dependencies': dependencies,
+        'names': sorted({dep['name'] for dep in dependencies}),
+        'locked': locked,
+        'files': sorted(parsed_files),
+        'requirements_files': sorted(requirements_files),
+        'requirements_roots': sorted(roots),
+        'requirements_includes': sorted(included | constraint_files),
+        'build_system': build,
+    }
+
+
+def dependency_names(repo_path: str, groups: Optional[set] = None) -> set:
+    """Normalized names of the repository's dependencies, optionally limited to some groups"""
+    return {dep['name'] for dep in extract_dependencies(repo_path)['dependencies']
+            if groups is None or dep['group'] in groups}
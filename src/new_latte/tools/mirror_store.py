@@ -0,0 +1,65 @@
+"""
+Local bare-mirror store for repositories the crew clones repeatedly.
+
+The first clone of a URL creates a ``git clone --mirror`` under the store
+root; later clones only fetch new objects into the mirror and then check
+out from it locally, which turns repeat clones into a cheap local copy.
+Enabled by setting ``NEW_LATTE_MIRROR_DIR`` (the daemon sets it by default).
+"""
+
+import hashlib
+import os
+import subprocess
+import threading
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+
+class MirrorStore:
+    """Keeps one bare mirror per repository URL under ``root``"""
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def mirror_path(self, repo_url: str) -> str:
+        """Stable, readable mirror directory for a URL"""
+        name = os.path.basename(urlparse(repo_url).path.rstrip('/')) or 'repo'
+        digest = hashlib.sha1(repo_url.encode('utf-8')).hexdigest()[:12]
+        return os.path.join(self.root, f"{name}-{digest}")
+
+    def _lock_for(self, path: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(path, threading.Lock())
+
+    def ensure(self, repo_url: str, timeout: int = 300) -> str:
+        """Create or refresh the mirror for ``repo_url`` and return its path"""
+        path = self.mirror_path(repo_url)
+        with self._lock_for(path):
+            if os.path.isdir(path):
+                command = ['git', '--git-dir', path, 'remote', 'update', '--prune']
+            else:
+                command = ['git', 'clone', '--mirror', repo_url, path]
+
+            result = subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+            if result.returncode != 0:
+                raise RuntimeError(result.stderr.strip() or f"{' '.join(command)} failed")
+        return path
+
+
+_default_store: Optional[MirrorStore] = None
+_default_store_guard = threading.Lock()
+
+
+def get_mirror_store() -> Optional[MirrorStore]:
+    """Process-wide store configured from NEW_LATTE_MIRROR_DIR, or None when disabled"""
+    global _default_store
+    root = os.getenv('NEW_LATTE_MIRROR_DIR')
+    if not root:
+        return None
+    with _default_store_guard:
+        if _default_store is None or _default_store.root != os.path.abspath(root):
+            _default_store = MirrorStore(root)
+        return _default_store
@@ -0,0 +1,181 @@
+"""
+Test-suite sizing and shard planning for generated workflows.
+
+Estimates how heavy a repository's test suite is (file count, test function
+count via AST, and historical durations from a JUnit XML report when one is
+available) and splits the test files into balanced shards that the workflow
+generator turns into a GitHub Actions matrix.
+"""
+
+import ast
+import math
+import os
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional
+
+from .manifest_parser import SKIP_DIRS, dependency_names
+
+# Roughly how many test functions one CI job should handle
+TESTS_PER_SHARD = 150
+MAX_SHARDS = 8
+# Share of test functions a JUnit report must cover before its durations are trusted
+MIN_JUNIT_COVERAGE = 0.5
+
+JUNIT_CANDIDATES = ['junit.xml', 'report.xml', 'test-results.xml',
+                    os.path.join('test-results', 'junit.xml'),
+                    os.path.join('reports', 'junit.xml')]
+
+
+def find_test_files(repo_path: str) -> List[str]:
+    """Relative paths of test_*.py / *_test.py files in the repository"""
+    test_files = []
+    for root, dirs, files in os.walk(repo_path):
+        dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+
+        for file in files:
+            if file.endswith('.py') and (file.startswith('test_') or file.endswith('_test.py')):
+                rel_path = os.path.relpath(os.path.join(root, file), repo_path)
+                test_files.append(rel_path.replace(os.sep, '/'))
+    return sorted(test_files)
+
+
+def count_test_functions(file_path: str) -> int:
+    """Count pytest-collectable test functions (module level and in Test* classes)"""
+    try:
+        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+            tree = ast.parse(f.read(), filename=file_path)
+    except (OSError, SyntaxError, ValueError):
+        return 0
+
+    count = 0
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name.startswith('test'):
+            count += 1
+        elif isinstance(node, ast.ClassDef) and node.name.startswith('Test'):
+            count += sum(
+                1 for item in node.body
+                if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)) and item.name.startswith('test')
+            )
+    return count
+
+
+def load_junit_durations(xml_path: str, test_files: List[str]) -> Dict[str, float]:
+    """Sum testcase durations from a JUnit XML report per test file"""
+    try:
+        root = ET.parse(xml_path).getroot()
+    except (OSError, ET.ParseError):
+        return {}
+
+    # Map dotted module names (tests.test_api) back to file paths
+    by_module = {path[:-3].replace('/', '.'): path for path in test_files}
+    durations: Dict[str, float] = {}
+
+    for case in root.iter('testcase'):
+        path = case.get('file')
+        if path:
+            path = path.replace(os.sep, '/')
+        else:
+            classname = case.get('classname', '')
+            path = None
+            # Strip trailing class names until we hit a known module
+            parts = classname.split('.')
+            while parts and path is None:
+                path = by_module.get('.'.join(parts))
+                parts.pop()
+        if path is None:
+            continue
+        try:
+            durations[path] = durations.get(path, 0.0) + float(case.get('time', 0) or 0)
+        except ValueError:
+            continue
+    return durations
+
+
+def plan_shards(weights: Dict[str, float], shard_count: int) -> List[List[str]]:
+    """Split files into shards of roughly equal weight (longest processing time first)"""
+    shard_count = max(1, min(shard_count, len(weights) or 1))
+    shards: List[List[str]] = [[] for _ in range(shard_count)]
+    loads = [0.0] * shard_count
+
+    for path, weight in sorted(weights.items(), key=lambda item: (-item[1], item[0])):
+        lightest = loads.index(min(loads))
+        shards[lightest].append(path)
+        loads[lightest] += weight
+
+    return [sorted(shard) for shard in shards if shard]
+
+
+def estimate_test_suite(repo_path: str, junit_xml: Optional[str] = None, shard_count: int = 0) -> dict:
+    """
+    Size a repository's test suite and plan balanced shards for it
+
+    Weights come from JUnit durations when a report covers most of the test
+    functions and from test function counts otherwise (no report, a stale
+    report whose files no longer exist, or all-zero times). A
+    ``shard_count`` of 0 picks one shard per TESTS_PER_SHARD test
+    functions, capped at MAX_SHARDS.
+    """
+    test_files = find_test_files(repo_path)
+    functions = {path: count_test_functions(os.path.join(repo_path, path)) for path in test_files}
+
+    if junit_xml is None:
+        for candidate in JUNIT_CANDIDATES:
+            if os.path.isfile(os.path.join(repo_path, candidate)):
+                junit_xml = os.path.join(repo_path, candidate)
+                break
+    reported = load_junit_durations(junit_xml, test_files) if junit_xml else {}
+    # Only durations of files that still exist in the checkout count
+    durations = {path: reported[path] for path in test_files if path in reported}
+
+    total_functions = sum(functions.values())
+    known_functions = sum(functions[path] for path in durations)
+    coverage = known_functions / total_functions if total_functions else 0.0
+    if sum(durations.values()) <= 0 or coverage < MIN_JUNIT_COVERAGE:
+        durations = {}
+
+    if durations:
+        # Files missing from the report get the average per-test duration
+        per_test = sum(durations.values()) / max(1, known_functions)
+        weights = {path: durations.get(path, functions[path] * per_test) for path in test_files}
+        weight_source = 'junit_durations'
+    else:
+        weights = {path: float(max(1, functions[path])) for path in test_files}
+        weight_source = 'test_function_count'
+
+    if shard_count <= 0:
+        shard_count = min(MAX_SHARDS, max(1, math.ceil(total_functions / TESTS_PER_SHARD)))
+
+    return {
+        'test_file_count': len(test_files),
+        'test_function_count': total_functions,
+        'junit_report': os.path.relpath(junit_xml, repo_path) if durations else None,
+        'estimated_duration_seconds': round(sum(durations.values()), 2) if durations else None,
+        'weight_source': weight_source,
+        'has_xdist': 'pytest-xdist' in dependency_names(repo_path),
+        'shards': plan_shards(weights, shard_count) if test_files else [],
+    }
+
+
+def render_shard_matrix(suite: dict, run_prefix: str = '', python_version: str = '3.12') -> str:
+    """
+    Render the matrix strategy and test step for a sharded test job
+
+    The python version is repeated in every include entry: include-only
+    matrices keep each shard a separate job instead of merging them into
+    an existing python-version combination.
+    """
+    shards = suite['shards']
+    if not shards:
+        return ''
+
+    lines = ['strategy:', '  fail-fast: false', '  matrix:', '    include:']
+    for index, shard in enumerate(shards, start=1):
+        lines.append(f'      - shard: {index}')
+        lines.append(f'        python-version: "{python_version}"')
+        lines.append(f'        tests: "{" ".join(shard)}"')
+
+    xdist = ' -n auto' if suite['has_xdist'] else ''
+    lines.append('steps:')
+    lines.append(f'  - name: Run tests (shard ${{{{ matrix.shard }}}} of {len(shards)})')
+    lines.append(f'    run: {run_prefix}python -m pytest ${{{{ matrix.tests }}}}{xdist}')
+    return '\n'.join(lines)
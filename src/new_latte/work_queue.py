@@ -0,0 +1,383 @@
+#!/usr/bin/env python
+"""
+Distributed work queue for fleet-wide batch analysis.
+
+One machine caps how many repositories can be cloned and analysed per hour.
+This module puts a pluggable queue between "which repos to analyse" and the
+crew: any number of worker processes, on any number of hosts, lease jobs
+from a shared backend, keep their lease alive with heartbeats while the crew
+runs, and write results to a shared result store. Jobs whose worker dies
+become visible again when the lease expires and are retried up to
+``max_attempts`` times. Workers retry transient backend errors (a busy
+SQLite file on a network share) instead of exiting, and delete each job's
+clone once its artifacts are published.
+
+``SQLiteQueue`` is the bundled backend; put the database (and the result
+directory) on a filesystem every worker can reach. Other services (e.g.
+Redis) plug in by implementing ``QueueBackend``.
+
+    queue enqueue --queue /shared/latte.db https://github.com/user/repo ...
+    queue work    --queue /shared/latte.db --results-dir /shared/results
+    queue status  --queue /shared/latte.db
+"""
+
+import argparse
+import json
+import os
+import shutil
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import closing
+from typing import Iterable, List, Optional
+
+DEFAULT_VISIBILITY_TIMEOUT = 600
+DEFAULT_MAX_ATTEMPTS = 3
+RETRY_BACKOFF_SECONDS = 30
+HEARTBEAT_RETRY_SECONDS = 5
+
+
+class Lease:
+    """A job handed to one worker until ``expires_at`` unless renewed"""
+
+    def __init__(self, job_id: str, github_repo_url: str, token: str, attempt: int, expires_at: float):
+        self.job_id = job_id
+        self.github_repo_url = github_repo_url
+        self.token = token
+        self.attempt = attempt
+        self.expires_at = expires_at
+
+
+class QueueBackend(ABC):
+    """Interface every queue backend implements"""
+
+    @abstractmethod
+    def enqueue(self, github_repo_url: str, max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> str:
+        """Add a job and return its id"""
+
+    @abstractmethod
+    def lease(self, worker_id: str, visibility_timeout: float) -> Optional[Lease]:
+        """Hand the next available job to ``worker_id``, or None if there is none"""
+
+    @abstractmethod
+    def heartbeat(self, lease: Lease, visibility_timeout: float) -> bool:
+        """Extend a lease; False means it was lost and the job must stop"""
+
+    @abstractmethod
+    def complete(self, lease: Lease, result: str) -> bool:
+        """Record a successful result; False if the lease was lost"""
+
+    @abstractmethod
+    def fail(self, lease: Lease, error: str) -> bool:
+        """Record a failed attempt, requeueing the job while attempts remain"""
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[dict]:
+        """Current state of one job"""
+
+    @abstractmethod
+    def counts(self) -> dict:
+        """Number of jobs per status"""
+
+
+class SQLiteQueue(QueueBackend):
+    """Queue backend on a single SQLite database, shareable over a filesystem"""
+
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with closing(self._connect()) as db:
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    github_repo_url TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL,
+                    available_at REAL NOT NULL,
+                    lease_token TEXT,
+                    leased_by TEXT,
+                    lease_expires_at REAL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    result TEXT,
+                    error TEXT
+                )
+            """)
+            db.execute("CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, available_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit mode; write transactions are opened explicitly
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        return db
+
+    def enqueue(self, github_repo_url: str, max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> str:
+        job_id = uuid.uuid4().hex[:12]
+        now = time.time()
+        with closing(self._connect()) as db:
+            db.execute(
+                "INSERT INTO jobs (id, github_repo_url, status, max_attempts, available_at, created_at, updated_at)"
+                " VALUES (?, ?, 'queued', ?, ?, ?, ?)",
+                (job_id, github_repo_url, max_attempts, now, now, now),
+            )
+        return job_id
+
+    def lease(self, worker_id: str, visibility_timeout: float) -> Optional[Lease]:
+        now = time.time()
+        db = self._connect()
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            # Expired leases whose worker vanished: retry or give up
+            db.execute(
+                "UPDATE jobs SET status = 'dead', error = 'Lease expired after final attempt', updated_at = ?"
+                " WHERE status = 'leased' AND lease_expires_at <= ? AND attempts >= max_attempts",
+                (now, now),
+            )
+            row = db.execute(
+                "SELECT id, github_repo_url, attempts FROM jobs"
+                " WHERE (status = 'queued' AND available_at <= ?)"
+                "    OR (status = 'leased' AND lease_expires_at <= ?)"
+                " ORDER BY available_at LIMIT 1",
+                (now, now),
+            ).fetchone()
+            if row is None:
+                db.execute("COMMIT")
+                return None
+
+            token = uuid.uuid4().hex
+            expires_at = now + visibility_timeout
+            db.execute(
+                "UPDATE jobs SET status = 'leased', attempts = attempts + 1, lease_token = ?, leased_by = ?,"
+                " lease_expires_at = ?, updated_at = ? WHERE id = ?",
+                (token, worker_id, expires_at, now, row["id"]),
+            )
+            db.execute("COMMIT")
+            return Lease(row["id"], row["github_repo_url"], token, row["attempts"] + 1, expires_at)
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        finally:
+            db.close()
+
+    def _update_leased(self, lease: Lease, assignments: str, params: tuple) -> bool:
+        with closing(self._connect()) as db:
+            cursor = db.execute(
+                f"UPDATE jobs SET {assignments}, updated_at = ? WHERE id = ? AND lease_token = ? AND status = 'leased'",
+                params + (time.time(), lease.job_id, lease.token),
+            )
+            return cursor.rowcount == 1
+
+    def heartbeat(self, lease: Lease, visibility_timeout: float) -> bool:
+        expires_at = time.time() + visibility_timeout
+        if self._update_leased(lease, "lease_expires_at = ?", (expires_at,)):
+            lease.expires_at = expires_at
+            return True
+        return False
+
+    def complete(self, lease: Lease, result: str) -> bool:
+        return self._update_leased(
+            lease, "status = 'succeeded', result = ?, error = NULL, lease_token = NULL", (result,)
+        )
+
+    def fail(self, lease: Lease, error: str) -> bool:
+        retry_at = time.time() + RETRY_BACKOFF_SECONDS * (2 ** (lease.attempt - 1))
+        return self._update_leased(
+            lease,
+            "status = CASE WHEN attempts >= max_attempts THEN 'dead' ELSE 'queued' END,"
+            " available_at = ?, error = ?, lease_token = NULL",
+            (retry_at, error),
+        )
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with closing(self._connect()) as db:
+            row = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def counts(self) -> dict:
+        with closing(self._connect()) as db:
+            rows = db.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+
+def get_backend(location: str) -> QueueBackend:
+    """Resolve a queue location (a path or sqlite:///path) to a backend"""
+    if location.startswith("sqlite:///"):
+        return SQLiteQueue(location[len("sqlite:///"):])
+    if "://" in location:
+        raise ValueError(f"No queue backend for {location}; implement QueueBackend for it")
+    return SQLiteQueue(location)
+
+
+class Worker:
+    """Leases jobs from a backend and runs the crew for each one"""
+
+    def __init__(
+        self,
+        backend: QueueBackend,
+        work_dir: str,
+        results_dir: Optional[str] = None,
+        visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT,
+        poll_interval: float = 5.0,
+    ):
+        self.backend = backend
+        self.work_dir = os.path.abspath(work_dir)
+        self.results_dir = os.path.abspath(results_dir) if results_dir else None
+        self.visibility_timeout = visibility_timeout
+        self.poll_interval = poll_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.llm = None
+
+    def _heartbeat(self, lease: Lease, lost: threading.Event, done: threading.Event):
+        interval = self.visibility_timeout / 3
+        while not done.wait(interval):
+            try:
+                renewed = self.backend.heartbeat(lease, self.visibility_timeout)
+            except Exception:
+                # Transient backend errors (e.g. "database is locked"): retry until the lease runs out
+                if time.time() >= lease.expires_at:
+                    lost.set()
+                    return
+                interval = min(HEARTBEAT_RETRY_SECONDS, self.visibility_timeout / 3)
+                continue
+            if not renewed:
+                lost.set()
+                return
+            interval = self.visibility_timeout / 3
+
+    def _stage_artifacts(self, workdir: str, staging: str):
+        """Copy artifacts next to their final location; published only once the job is completed"""
+        from new_latte.server import JOB_ARTIFACTS
+
+        os.makedirs(staging, exist_ok=True)
+        for name in JOB_ARTIFACTS:
+            path = os.path.join(workdir, name)
+            if os.path.isfile(path):
+                shutil.copy2(path, os.path.join(staging, name))
+
+    def _publish_artifacts(self, lease: Lease, staging: str):
+        target = os.path.join(self.results_dir, lease.job_id)
+        if os.path.isdir(target):
+            shutil.rmtree(target)
+        os.replace(staging, target)
+
+    def _settle(self, record, lease: Lease, lost: threading.Event, outcome: str) -> bool:
+        """complete() or fail() a lease, retrying transient backend errors while the lease is held"""
+        while True:
+            try:
+                return record(lease, outcome)
+            except Exception:
+                if lost.is_set() or time.time() >= lease.expires_at:
+                    return False  # The job becomes visible again once the lease expires
+                time.sleep(HEARTBEAT_RETRY_SECONDS)
+
+    def run_one(self) -> bool:
+        """Process a single job; False when the queue had nothing to lease"""
+        # Imported lazily so enqueue/status don't pay for crewai
+        from new_latte.llm_router import build_llm
+        from new_latte.server import JobCancelled, kickoff_in_workdir
+
+        lease = self.backend.lease(self.worker_id, self.visibility_timeout)
+        if lease is None:
+            return False
+        if self.llm is None:
+            self.llm = build_llm()
+
+        workdir = os.path.join(self.work_dir, f"{lease.job_id}-{lease.attempt}")
+        staging = os.path.join(self.results_dir, f".{lease.job_id}.{lease.token}") if self.results_dir else None
+        lost, done = threading.Event(), threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(lease, lost, done), daemon=True)
+        heartbeat.start()
+        try:
+            try:
+                result = kickoff_in_workdir(self.llm, lease.github_repo_url, workdir, lost)
+                if lost.is_set():
+                    raise JobCancelled(f"Lease on {lease.job_id} lost")
+                if staging:
+                    self._stage_artifacts(workdir, staging)
+            except JobCancelled:
+                return True  # Lease lost; another worker owns the job now
+            except Exception as e:
+                self._settle(self.backend.fail, lease, lost, f"An error occurred while running the crew: {e}")
+                return True
+
+            # complete() is the atomic ownership check; a worker that lost the lease discards its artifacts
+            if self._settle(self.backend.complete, lease, lost, result) and staging:
+                self._publish_artifacts(lease, staging)
+        finally:
+            done.set()
+            heartbeat.join()
+            # The clone and any unpublished artifacts are not needed on any path
+            if staging:
+                shutil.rmtree(staging, ignore_errors=True)
+            shutil.rmtree(workdir, ignore_errors=True)
+        return True
+
+    def run_forever(self, stop_when_empty: bool = False):
+        while True:
+            try:
+                leased = self.run_one()
+            except Exception as e:
+                # e.g. "database is locked" from lease(); keep the worker alive and poll again
+                print(f"Worker {self.worker_id}: {e}", file=sys.stderr)
+                leased = None
+            if leased is False and stop_when_empty:
+                return
+            if not leased:
+                time.sleep(self.poll_interval)
+
+
+def _read_urls(urls: List[str]) -> Iterable[str]:
+    """URLs from the command line, with '-' reading one URL per line from stdin"""
+    for url in urls:
+        if url == "-":
+            for line in sys.stdin:
+                if line.strip() and not line.startswith("#"):
+                    yield line.strip()
+        else:
+            yield url
+
+
+def main():
+    """
+    Enqueue repositories, run workers or inspect a shared work queue.
+    """
+    parser = argparse.ArgumentParser(description="NewLatte distributed work queue")
+    parser.add_argument("--queue", default=os.getenv("NEW_LATTE_QUEUE", "new_latte_queue.db"),
+                        help="Queue location (SQLite path or sqlite:///path)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    enqueue = commands.add_parser("enqueue", help="Add repositories to the queue")
+    enqueue.add_argument("urls", nargs="+", help="Repository URLs, or - to read them from stdin")
+    enqueue.add_argument("--max-attempts", type=int, default=DEFAULT_MAX_ATTEMPTS)
+
+    work = commands.add_parser("work", help="Run a worker")
+    work.add_argument("--work-dir", default="./queue_work")
+    work.add_argument("--results-dir", help="Shared directory to copy generated artifacts into")
+    work.add_argument("--visibility-timeout", type=float, default=DEFAULT_VISIBILITY_TIMEOUT)
+    work.add_argument("--exit-when-empty", action="store_true")
+
+    status = commands.add_parser("status", help="Show job counts or one job")
+    status.add_argument("job_id", nargs="?")
+
+    args = parser.parse_args(sys.argv[1:])
+    backend = get_backend(args.queue)
+
+    if args.command == "enqueue":
+        for url in _read_urls(args.urls):
+            print(f"{backend.enqueue(url, args.max_attempts)}\t{url}")
+    elif args.command == "work":
+        worker = Worker(backend, args.work_dir, args.results_dir, args.visibility_timeout)
+        worker.run_forever(stop_when_empty=args.exit_when_empty)
+    elif args.job_id:
+        print(json.dumps(backend.get(args.job_id), indent=2))
+    else:
+        print(json.dumps(backend.counts(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+import os
+
+import pytest
+
+# crewai reads these when it is first imported
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+
+@pytest.fixture
+def mock_llm(tmp_path, monkeypatch):
+    """Route the crew to the load test's scripted LLM server, with all state under tmp_path"""
+    from new_latte.loadtest import MockLLMConfig, start_mock_server, write_endpoints_file
+
+    server = start_mock_server(MockLLMConfig(latency=0))
+    endpoints_file = tmp_path / "llm_endpoints.yaml"
+    write_endpoints_file(str(endpoints_file), f"http://127.0.0.1:{server.server_port}", 1, 8)
+
+    monkeypatch.setenv("LLM_ENDPOINTS_FILE", str(endpoints_file))
+    monkeypatch.setenv("OPENAI_API_KEY", "mock")
+    monkeypatch.setenv("CREWAI_DISABLE_TELEMETRY", "true")
+    monkeypatch.setenv("OTEL_SDK_DISABLED", "true")
+    monkeypatch.setenv("NEW_LATTE_CACHE_DIR", str(tmp_path / "cache"))
+    # Keep crewai's latest-kickoff task outputs inside the test directory
+    monkeypatch.setenv("XDG_DATA_HOME", str(tmp_path / "data"))
+    monkeypatch.setenv("CREWAI_STORAGE_DIR", "new-latte-tests")
+    monkeypatch.delenv("NEW_LATTE_MIRROR_DIR", raising=False)
+
+    work = tmp_path / "work"
+    work.mkdir()
+    monkeypatch.chdir(work)
+    yield server
+    server.shutdown()
@@ -0,0 +1,83 @@
+import os
+
+import pytest
+
+from new_latte.cassette import Cassette, recorded, use_cassette
+
+
+@recorded(setup=True, succeeded=lambda result: result.startswith("Successfully cloned"))
+def fake_clone(repo_url, target_dir="./cloned_repo"):
+    if os.path.exists(target_dir):
+        return f"Failed to clone repository: {target_dir} already exists"
+    os.makedirs(target_dir)
+    with open(os.path.join(target_dir, "README"), "w") as f:
+        f.write(repo_url)
+    return f"Successfully cloned repository to: {target_dir}"
+
+
+@recorded
+def fake_read(path):
+    if not os.path.exists(path):
+        return f"File does not exist: {path}"
+    with open(path) as f:
+        return f.read()
+
+
+@pytest.fixture
+def recording(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    path = str(tmp_path / "run.cassette")
+    with use_cassette(Cassette(path, "record", {"github_repo_url": "repo-url"})):
+        fake_clone("repo-url")
+        fake_read("./cloned_repo/README")
+    # Replays happen without the recording's checkout
+    os.remove("cloned_repo/README")
+    os.rmdir("cloned_repo")
+    return path
+
+
+def test_replay_serves_tools_without_side_effects(recording):
+    cassette = Cassette.load(recording)
+    with use_cassette(cassette):
+        assert fake_clone("repo-url").startswith("Successfully cloned")
+        assert fake_read("./cloned_repo/README") == "repo-url"
+
+    assert cassette.inputs == {"github_repo_url": "repo-url"}
+    assert cassette.stats["tool_hits"] == 2
+    assert not os.path.exists("cloned_repo")
+
+
+def test_tool_miss_reruns_recorded_setup(recording):
+    cassette = Cassette.load(recording)
+    with use_cassette(cassette):
+        fake_clone("repo-url")
+        # Not in the cassette: must run against a real checkout
+        assert fake_read("./cloned_repo/README") == "repo-url"
+        assert fake_read("./cloned_repo/README") == "repo-url"
+
+    assert cassette.stats["tool_misses"] == 1
+
+
+def test_rewind_replays_every_kickoff(recording):
+    cassette = Cassette.load(recording)
+    with use_cassette(cassette):
+        for _ in range(3):
+            cassette.rewind()
+            fake_clone("repo-url")
+            fake_read("./cloned_repo/README")
+
+    assert cassette.stats == {"tool_hits": 6, "tool_misses": 0, "llm_hits": 0, "llm_misses": 0}
+    assert not os.path.exists("cloned_repo")
+
+
+def test_failed_setup_rerun_is_an_error(recording):
+    # A leftover checkout from an earlier run makes the re-clone fail
+    os.makedirs("cloned_repo")
+    cassette = Cassette.load(recording)
+    with use_cassette(cassette):
+        fake_clone("repo-url")
+        for _ in range(2):
+            with pytest.raises(RuntimeError, match="already exists"):
+                fake_read("./cloned_repo/setup.py")
+
+    assert "could not re-run fake_clone" in cassette.setup_error
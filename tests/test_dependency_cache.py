@@ -0,0 +1,105 @@
+import json
+
+import pytest
+
+from new_latte.tools import analysis_cache
+from new_latte.tools.dependency_cache import detect_package_manager, render_cache_steps
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("NEW_LATTE_CACHE_DIR", str(tmp_path / "cache"))
+    analysis_cache.clear_cache()
+    yield
+    analysis_cache.clear_cache()
+
+
+def write(root, rel_path, content=""):
+    path = root / rel_path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+
+
+def test_uv(tmp_path):
+    write(tmp_path, "pyproject.toml", '[project]\nname = "app"\n')
+    write(tmp_path, "uv.lock", 'version = 1\nrequires-python = ">=3.11"\n')
+
+    plan = detect_package_manager(str(tmp_path))
+
+    assert plan["package_manager"] == "uv"
+    assert plan["install_command"] == "uv sync --frozen --all-extras"
+    assert plan["setup_python_cache"] is None
+    assert plan["run_prefix"] == "uv run "
+    assert plan["python_version_constraint"] == ">=3.11"
+    steps = render_cache_steps(plan, python_version="3.12")
+    assert "astral-sh/setup-uv" in steps
+    assert "cache-dependency-glob: uv.lock" in steps
+    assert "actions/setup-python" not in steps
+
+
+def test_poetry(tmp_path):
+    write(tmp_path, "pyproject.toml", '[tool.poetry]\nname = "app"\n')
+    write(tmp_path, "poetry.lock", '[metadata]\npython-versions = "^3.10"\n')
+
+    plan = detect_package_manager(str(tmp_path))
+
+    assert plan["package_manager"] == "poetry"
+    assert plan["cache_dependency_path"] == ["poetry.lock"]
+    assert plan["python_version_constraint"] == "^3.10"
+    steps = render_cache_steps(plan)
+    # poetry must be installed before setup-python resolves its cache
+    assert steps.index("pipx install poetry") < steps.index("actions/setup-python")
+    assert "cache: poetry" in steps
+    assert "run: poetry install --no-interaction" in steps
+
+
+def test_pipenv(tmp_path):
+    write(tmp_path, "Pipfile", '[packages]\nflask = "*"\n')
+    write(tmp_path, "Pipfile.lock", json.dumps({"_meta": {"requires": {"python_version": "3.11"}}}))
+
+    plan = detect_package_manager(str(tmp_path))
+
+    assert plan["package_manager"] == "pipenv"
+    assert plan["install_command"] == "pipenv sync --dev"
+    assert plan["python_version_constraint"] == "3.11"
+    steps = render_cache_steps(plan)
+    assert "cache: pipenv" in steps
+    assert "python -m pip install pipenv" in steps
+
+
+def test_pip_requirements_installs_the_project(tmp_path):
+    write(tmp_path, "requirements.txt", "-r requirements/base.txt\n")
+    write(tmp_path, "requirements/base.txt", "requests\n")
+    write(tmp_path, "pyproject.toml", '[project]\nname = "app"\n')
+
+    plan = detect_package_manager(str(tmp_path))
+
+    assert plan["package_manager"] == "pip"
+    assert plan["install_command"] == "python -m pip install -r requirements.txt -e ."
+    assert plan["cache_dependency_path"] == ["requirements.txt", "requirements/base.txt", "pyproject.toml"]
+    assert render_cache_steps(plan, python_version="3.12") == (
+        "- uses: actions/setup-python@v5\n"
+        "  with:\n"
+        "    python-version: 3.12\n"
+        "    cache: pip\n"
+        "    cache-dependency-path: |\n"
+        "      requirements.txt\n"
+        "      requirements/base.txt\n"
+        "      pyproject.toml\n"
+        "- name: Install dependencies\n"
+        "  run: python -m pip install -r requirements.txt -e ."
+    )
+
+
+def test_pip_without_a_project(tmp_path):
+    write(tmp_path, "requirements.txt", "requests\n")
+    assert detect_package_manager(str(tmp_path))["install_command"] == "python -m pip install -r requirements.txt"
+
+    empty = tmp_path / "empty"
+    empty.mkdir()
+    plan = detect_package_manager(str(empty))
+    assert plan["install_command"] is None
+    assert plan["setup_python_cache"] is None
+    assert render_cache_steps(plan, python_version="3.12") == (
+        "- uses: actions/setup-python@v5\n  with:\n    python-version: 3.12"
+    )
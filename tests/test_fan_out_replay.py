@@ -0,0 +1,43 @@
+import pytest
+
+pytest.importorskip("crewai")
+
+from crewai.utilities.task_output_storage_handler import TaskOutputStorageHandler  # noqa: E402
+
+from new_latte.loadtest import build_corpus  # noqa: E402
+
+TASK_ORDER = [
+    "analyze_test_build_setup",
+    "generate_test_build_workflow",
+    "create_deployment_configurations",
+    "create_deployment_documentation",
+]
+
+
+def test_fan_out_run_can_be_replayed_by_task_id(tmp_path, mock_llm):
+    from new_latte.crew import NewLatte
+
+    [url] = build_corpus(str(tmp_path / "corpus"), 1)
+    inputs = {"current_year": "2026", "github_repo_url": url}
+    NewLatte().kickoff_fan_out(inputs=inputs)
+
+    stored = TaskOutputStorageHandler().load()
+    crew = NewLatte().crew()
+    assert [crew_task.name for crew_task in crew.tasks] == TASK_ORDER
+    roles = [crew_task.agent.role.strip() for crew_task in crew.tasks]
+
+    assert [row["task_index"] for row in stored] == [0, 1, 2, 3]
+    assert [row["output"]["agent"].strip() for row in stored] == roles
+    assert all(row["inputs"]["github_repo_url"] == url for row in stored)
+    analysis_output = stored[0]["output"]["raw"]
+
+    # Replaying the deployment configuration step reuses the stored analysis and workflow
+    requests_before = mock_llm.config.stats["requests"]
+    crew.replay(task_id=stored[2]["task_id"])
+
+    replayed = TaskOutputStorageHandler().load()
+    assert [row["was_replayed"] for row in replayed] == [False, False, True, True]
+    assert replayed[0]["output"]["raw"] == analysis_output
+    assert [row["output"]["agent"].strip() for row in replayed] == roles
+    # Only the two replayed tasks reached the LLM
+    assert mock_llm.config.stats["requests"] - requests_before == 2
@@ -0,0 +1,168 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("crewai")
+
+from crewai import LLM  # noqa: E402
+
+from new_latte.llm_router import Endpoint, LLMCallCancelled, NoHealthyEndpointError, RoutedLLM  # noqa: E402
+
+
+class StubServer:
+    """OpenAI-compatible chat completions stub answering with scripted status codes"""
+
+    def __init__(self, name, statuses=(200,)):
+        self.name = name
+        self.statuses = list(statuses)
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                stub.requests.append(json.loads(self.rfile.read(length) or b"{}"))
+                status = stub.statuses.pop(0) if len(stub.statuses) > 1 else stub.statuses[0]
+                if status == 200:
+                    payload = {
+                        "id": "chatcmpl-stub",
+                        "object": "chat.completion",
+                        "created": int(time.time()),
+                        "model": "stub",
+                        "choices": [{
+                            "index": 0,
+                            "message": {"role": "assistant", "content": f"answer from {stub.name}"},
+                            "finish_reason": "stop",
+                        }],
+                        "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+                    }
+                else:
+                    payload = {"error": {"message": f"stub error {status}", "type": "stub", "code": str(status)}}
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def endpoint(self, **kwargs):
+        llm = LLM(
+            model="openai/stub",
+            base_url=f"http://127.0.0.1:{self.server.server_port}/v1",
+            api_key="stub",
+            max_retries=0,
+        )
+        return Endpoint(self.name, llm, **kwargs)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stubs():
+    servers = []
+
+    def make(name, statuses=(200,)):
+        server = StubServer(name, statuses)
+        servers.append(server)
+        return server
+
+    yield make
+    for server in servers:
+        server.close()
+
+
+def routed(*endpoints, **kwargs):
+    kwargs.setdefault("backoff_base", 0.01)
+    kwargs.setdefault("backoff_max", 0.05)
+    return RoutedLLM(list(endpoints), **kwargs)
+
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+
+def test_stop_words_reach_endpoint(stubs):
+    stub = stubs("primary")
+    llm = routed(stub.endpoint())
+    llm.stop = ["\nObservation:"]
+
+    assert llm.call(MESSAGES) == "answer from primary"
+    assert stub.requests[-1]["stop"] == ["\nObservation:"]
+
+
+def test_cancelled_kickoff_sends_no_more_requests(stubs):
+    stub = stubs("primary")
+    llm = routed(stub.endpoint())
+    cancelled = threading.Event()
+
+    with llm.cancel_on(cancelled):
+        assert llm.call(MESSAGES) == "answer from primary"
+        cancelled.set()
+        with pytest.raises(LLMCallCancelled):
+            llm.call(MESSAGES)
+    # The guard only applies to the kickoff it was installed for
+    assert llm.call(MESSAGES) == "answer from primary"
+    assert len(stub.requests) == 2
+
+
+def test_rate_limit_parks_endpoint_and_uses_the_rest(stubs):
+    limited, healthy = stubs("limited", [429]), stubs("healthy")
+    first = limited.endpoint(weight=100)
+    llm = routed(first, healthy.endpoint())
+
+    assert llm.call(MESSAGES) == "answer from healthy"
+    assert first.throttled_until > 0
+    assert first.consecutive_failures == 0
+
+
+def test_rate_limit_is_retried_after_backoff(stubs):
+    stub = stubs("only", [429, 429, 200])
+    endpoint = stub.endpoint()
+    llm = routed(endpoint)
+
+    assert llm.call(MESSAGES) == "answer from only"
+    assert len(stub.requests) == 3
+    assert endpoint.consecutive_failures == 0
+
+
+@pytest.mark.parametrize("status", [404, 500, 503])
+def test_missing_deployment_or_server_error_fails_over(stubs, status):
+    broken, healthy = stubs("broken", [status]), stubs("healthy")
+    first = broken.endpoint(weight=100)
+    llm = routed(first, healthy.endpoint())
+
+    assert llm.call(MESSAGES) == "answer from healthy"
+    assert first.consecutive_failures == 1
+    assert len(broken.requests) == 1
+
+
+def test_circuit_breaker_opens_and_closes(stubs):
+    stub = stubs("flaky", [500])
+    endpoint = stub.endpoint(failure_threshold=2, cooldown_seconds=0.3)
+    llm = routed(endpoint)
+
+    for _ in range(2):
+        with pytest.raises(Exception):
+            llm.call(MESSAGES)
+    assert endpoint.open_until > time.monotonic()
+
+    # Open breaker: rejected without reaching the server
+    with pytest.raises(NoHealthyEndpointError):
+        llm.call(MESSAGES)
+    assert len(stub.requests) == 2
+
+    stub.statuses = [200]
+    time.sleep(0.35)
+    assert llm.call(MESSAGES) == "answer from flaky"
+    assert endpoint.consecutive_failures == 0
+    assert endpoint.open_until == 0.0
@@ -0,0 +1,20 @@
+from new_latte import loadtest
+
+
+def test_report_separates_kickoff_and_process_latency(monkeypatch):
+    runs = {
+        "a": {"process_seconds": 9.0, "kickoff_seconds": 2.0, "iterations": 4, "tool_calls": 3},
+        "b": {"process_seconds": 11.0, "kickoff_seconds": 4.0, "iterations": 6, "tool_calls": 5},
+        "c": {"process_seconds": 1.0, "error": "exited with 1"},
+    }
+    monkeypatch.setattr(loadtest, "_run_one", lambda url, workdir, env, timeout: dict(runs[url], url=url))
+
+    report = loadtest.run_load(["a", "b", "c"], concurrency=2, work_root="unused", env={}, timeout=1)
+
+    assert report["succeeded"] == 2
+    assert report["kickoff_seconds"] == {"p50": 2.0, "p95": 4.0, "p99": 4.0}
+    assert report["process_seconds"] == {"p50": 9.0, "p95": 11.0, "p99": 11.0}
+    # 6s of kickoffs spread over 2 slots: 2 repos per 3s
+    assert report["repos_per_minute"] == 40.0
+    assert report["iterations_per_repo"] == 5
+    assert report["errors"] == ["exited with 1"]
@@ -0,0 +1,182 @@
+import json
+import subprocess
+import textwrap
+
+import pytest
+
+from new_latte.tools import analysis_cache, manifest_parser
+from new_latte.tools.manifest_parser import classify_group, extract_dependencies, normalize_name
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("NEW_LATTE_CACHE_DIR", str(tmp_path / "cache"))
+    analysis_cache.clear_cache()
+    yield
+    analysis_cache.clear_cache()
+
+
+def write(root, rel_path, content):
+    path = root / rel_path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(textwrap.dedent(content))
+
+
+def by_name(result):
+    return {dep["name"]: dep for dep in result["dependencies"]}
+
+
+def test_normalize_and_classify():
+    assert normalize_name("Flask_SQLAlchemy") == "flask-sqlalchemy"
+    assert classify_group("requirements-test.txt") == "test"
+    assert classify_group("lint") == "dev"
+    assert classify_group("server") == "runtime"
+
+
+def test_requirements_includes_and_constraints(tmp_path):
+    write(tmp_path, "requirements.txt", """\
+        Django>=4.2,<5  # web
+        requests[socks]==2.31.0 ; python_version >= "3.8"
+        -c constraints.txt
+    """)
+    write(tmp_path, "requirements-dev.txt", """\
+        -r requirements.txt
+        --requirement requirements/test.txt
+        black \\
+            --hash=sha256:abc
+    """)
+    write(tmp_path, "requirements/test.txt", "pytest>=7\n-e git+https://example.com/x.git#egg=pytest-xdist\n")
+    write(tmp_path, "constraints.txt", "urllib3<2\n")
+
+    result = extract_dependencies(str(tmp_path))
+    deps = by_name(result)
+
+    assert deps["django"]["specifier"] == "<5,>=4.2"
+    assert deps["requests"]["extras"] == ["socks"]
+    assert deps["requests"]["marker"] == 'python_version >= "3.8"'
+    assert deps["black"]["group"] == "dev"
+    assert deps["pytest"]["group"] == "test"
+    assert "pytest-xdist" in deps
+    # Constraints pin versions but are not dependencies
+    assert "urllib3" not in deps
+
+    assert result["requirements_roots"] == ["requirements-dev.txt"]
+    assert set(result["requirements_includes"]) == {"constraints.txt", "requirements.txt", "requirements/test.txt"}
+
+
+def test_poetry_groups_and_build_system(tmp_path):
+    write(tmp_path, "pyproject.toml", """\
+        [tool.poetry]
+        name = "app"
+
+        [tool.poetry.dependencies]
+        python = "^3.10"
+        fastapi = "^0.110"
+        uvicorn = { version = ">=0.29", extras = ["standard"] }
+
+        [tool.poetry.group.test.dependencies]
+        pytest = "*"
+
+        [tool.poetry.group.lint.dependencies]
+        ruff = "^0.4"
+
+        [build-system]
+        requires = ["poetry-core"]
+        build-backend = "poetry.core.masonry.api"
+    """)
+
+    result = extract_dependencies(str(tmp_path))
+    deps = by_name(result)
+
+    assert "python" not in deps
+    assert deps["fastapi"]["group"] == "runtime"
+    assert deps["fastapi"]["specifier"] == "^0.110"
+    assert deps["uvicorn"]["extras"] == ["standard"]
+    assert deps["pytest"]["group"] == "test"
+    assert deps["pytest"]["specifier"] == ""
+    assert deps["ruff"]["group"] == "dev"
+    assert result["build_system"] == {
+        "backend": "poetry.core.masonry.api", "requires": ["poetry-core"], "poetry": True,
+    }
+
+
+def test_includes_stay_inside_the_repository(tmp_path):
+    write(tmp_path, "secret/requirements.txt", "leaked-abs\n")
+    write(tmp_path, "sibling.txt", "leaked-parent\n")
+    write(tmp_path, "elsewhere.txt", "leaked-link\n")
+    repo = tmp_path / "repo"
+    write(repo, "requirements.txt", f"""\
+        requests
+        -r {tmp_path / "secret" / "requirements.txt"}
+        -r ../sibling.txt
+        -c requirements/link.txt
+    """)
+    (repo / "requirements").mkdir()
+    (repo / "requirements" / "link.txt").symlink_to(tmp_path / "elsewhere.txt")
+
+    result = extract_dependencies(str(repo))
+
+    assert result["names"] == ["requests"]
+    assert result["files"] == ["requirements.txt"]
+    assert result["requirements_includes"] == []
+
+
+def test_pipfile_and_lock(tmp_path):
+    write(tmp_path, "Pipfile", """\
+        [packages]
+        Flask = "*"
+
+        [dev-packages]
+        pytest = ">=7"
+    """)
+    (tmp_path / "Pipfile.lock").write_text(json.dumps({
+        "default": {"flask": {"version": "==3.0.2"}},
+        "develop": {"pytest": {"version": "==8.1.1"}},
+    }))
+
+    result = extract_dependencies(str(tmp_path))
+    deps = by_name(result)
+
+    assert deps["flask"]["group"] == "runtime"
+    assert deps["flask"]["locked_version"] == "3.0.2"
+    assert deps["pytest"]["group"] == "dev"
+    assert deps["pytest"]["locked_version"] == "8.1.1"
+    assert result["locked"] == {"flask": "3.0.2", "pytest": "8.1.1"}
+
+
+def test_skips_vendored_directories(tmp_path):
+    write(tmp_path, "requirements.txt", "requests\n")
+    write(tmp_path, ".venv/lib/requirements.txt", "left-pad\n")
+    write(tmp_path, "node_modules/pkg/requirements.txt", "left-pad\n")
+
+    assert extract_dependencies(str(tmp_path))["names"] == ["requests"]
+
+
+def test_one_walk_per_checkout(tmp_path, monkeypatch):
+    repo = tmp_path / "repo"
+    write(repo, "requirements.txt", "pytest-xdist\n")
+    git = ["git", "-c", "user.name=t", "-c", "user.email=t@t", "-C", str(repo)]
+    subprocess.run(["git", "init", "-q", str(repo)], check=True)
+    subprocess.run(git + ["add", "-A"], check=True)
+    subprocess.run(git + ["commit", "-q", "-m", "init"], check=True)
+    clone = tmp_path / "clone"
+    subprocess.run(["git", "clone", "-q", str(repo), str(clone)], check=True)
+
+    walks = []
+    find_manifests = manifest_parser.find_manifests
+    monkeypatch.setattr(manifest_parser, "find_manifests", lambda path: walks.append(path) or find_manifests(path))
+
+    # Same commit in two checkouts, asked for by several tools
+    assert "pytest-xdist" in manifest_parser.dependency_names(str(repo))
+    assert extract_dependencies(str(repo))["names"] == ["pytest-xdist"]
+    assert extract_dependencies(str(clone))["names"] == ["pytest-xdist"]
+    assert len(walks) == 1
+
+
+def test_memory_cache_is_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(manifest_parser, "MAX_MEMORY_ENTRIES", 3)
+    for index in range(5):
+        write(tmp_path, f"r{index}/requirements.txt", f"pkg{index}\n")
+        manifest_parser.parse_manifest(str(tmp_path / f"r{index}"), "requirements.txt")
+
+    assert len(manifest_parser._memory_cache) == 3
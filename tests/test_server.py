@@ -0,0 +1,23 @@
+import threading
+
+import pytest
+
+pytest.importorskip("crewai")
+
+from new_latte.loadtest import build_corpus  # noqa: E402
+
+
+def test_cancelled_kickoff_stops_reaching_the_llm(tmp_path, mock_llm):
+    from new_latte.llm_router import build_llm
+    from new_latte.server import JobCancelled, kickoff_in_workdir
+
+    class CancelAfterFirstRequest(threading.Event):
+        def is_set(self):
+            return mock_llm.config.stats["requests"] >= 1
+
+    [url] = build_corpus(str(tmp_path / "corpus"), 1)
+    with pytest.raises(JobCancelled):
+        kickoff_in_workdir(build_llm(), url, str(tmp_path / "job"), CancelAfterFirstRequest())
+
+    # crewai retries the cancelled task, but the retries never reach the LLM
+    assert mock_llm.config.stats["requests"] == 1
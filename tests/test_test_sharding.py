@@ -0,0 +1,99 @@
+import textwrap
+
+import pytest
+
+from new_latte.tools import analysis_cache
+from new_latte.tools.test_sharding import estimate_test_suite, plan_shards, render_shard_matrix
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("NEW_LATTE_CACHE_DIR", str(tmp_path / "cache"))
+    analysis_cache.clear_cache()
+    yield
+    analysis_cache.clear_cache()
+
+
+def write_tests(root, rel_path, count):
+    path = root / rel_path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("".join(f"def test_{index}():\n    pass\n\n" for index in range(count)))
+
+
+def write_junit(root, cases, attribute="classname"):
+    body = "".join(f'<testcase {attribute}="{name}" name="t" time="{time}"/>' for name, time in cases)
+    (root / "junit.xml").write_text(f"<testsuites><testsuite>{body}</testsuite></testsuites>")
+
+
+def test_plan_shards_balances_weights():
+    weights = {"a.py": 8.0, "b.py": 5.0, "c.py": 4.0, "d.py": 3.0, "e.py": 1.0}
+    shards = plan_shards(weights, 2)
+
+    loads = sorted(sum(weights[path] for path in shard) for shard in shards)
+    assert loads == [10.0, 11.0]
+    assert sorted(path for shard in shards for path in shard) == sorted(weights)
+    # Never more shards than files
+    assert plan_shards({"a.py": 1.0}, 4) == [["a.py"]]
+
+
+def test_junit_durations_map_classnames_to_files(tmp_path):
+    write_tests(tmp_path, "tests/test_api.py", 2)
+    write_tests(tmp_path, "tests/test_models.py", 2)
+    write_tests(tmp_path, "tests/test_utils.py", 2)
+    write_junit(tmp_path, [
+        ("tests.test_api.TestClient", 30), ("tests.test_api", 10),
+        ("tests.test_models", 2), ("tests.test_utils", 1),
+        ("tests.test_removed", 500),
+    ])
+
+    suite = estimate_test_suite(str(tmp_path), shard_count=2)
+
+    assert suite["weight_source"] == "junit_durations"
+    assert suite["junit_report"] == "junit.xml"
+    # The deleted module's time does not count
+    assert suite["estimated_duration_seconds"] == 43
+    assert suite["shards"] == [["tests/test_api.py"], ["tests/test_models.py", "tests/test_utils.py"]]
+
+
+def test_unmatched_junit_report_falls_back_to_function_counts(tmp_path):
+    write_tests(tmp_path, "tests/test_a.py", 6)
+    write_tests(tmp_path, "tests/test_b.py", 3)
+    write_tests(tmp_path, "tests/test_c.py", 3)
+    # Report from before the tests moved
+    write_junit(tmp_path, [("old_tests/test_a.py", 12), ("old_tests/test_b.py", 4)], attribute="file")
+
+    suite = estimate_test_suite(str(tmp_path), shard_count=2)
+
+    assert suite["weight_source"] == "test_function_count"
+    assert suite["estimated_duration_seconds"] is None
+    assert suite["shards"] == [["tests/test_a.py"], ["tests/test_b.py", "tests/test_c.py"]]
+
+
+def test_low_coverage_or_zero_times_fall_back(tmp_path):
+    write_tests(tmp_path, "tests/test_a.py", 1)
+    write_tests(tmp_path, "tests/test_b.py", 9)
+    write_junit(tmp_path, [("tests.test_a", 50)])
+    assert estimate_test_suite(str(tmp_path))["weight_source"] == "test_function_count"
+
+    write_junit(tmp_path, [("tests.test_a", 0), ("tests.test_b", 0)])
+    assert estimate_test_suite(str(tmp_path))["weight_source"] == "test_function_count"
+
+
+def test_render_shard_matrix():
+    suite = {"shards": [["tests/test_a.py"], ["tests/test_b.py", "tests/test_c.py"]], "has_xdist": True}
+
+    assert render_shard_matrix(suite, run_prefix="poetry run ", python_version="3.11") == textwrap.dedent("""\
+        strategy:
+          fail-fast: false
+          matrix:
+            include:
+              - shard: 1
+                python-version: "3.11"
+                tests: "tests/test_a.py"
+              - shard: 2
+                python-version: "3.11"
+                tests: "tests/test_b.py tests/test_c.py"
+        steps:
+          - name: Run tests (shard ${{ matrix.shard }} of 2)
+            run: poetry run python -m pytest ${{ matrix.tests }} -n auto""")
+    assert render_shard_matrix({"shards": [], "has_xdist": False}) == ""
@@ -0,0 +1,249 @@
+import os
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from new_latte import work_queue
+from new_latte.work_queue import Lease, SQLiteQueue, Worker, get_backend
+
+
+@pytest.fixture
+def backend(tmp_path):
+    return SQLiteQueue(str(tmp_path / "queue.db"))
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(work_queue, "RETRY_BACKOFF_SECONDS", 0)
+
+
+def test_lease_and_complete(backend):
+    job_id = backend.enqueue("https://example.com/repo")
+
+    lease = backend.lease("worker-a", visibility_timeout=60)
+    assert lease.job_id == job_id
+    assert lease.attempt == 1
+    assert backend.lease("worker-b", visibility_timeout=60) is None
+
+    assert backend.complete(lease, "done")
+    job = backend.get(job_id)
+    assert job["status"] == "succeeded"
+    assert job["result"] == "done"
+    assert backend.counts() == {"succeeded": 1}
+
+
+def test_heartbeat_extends_lease(backend):
+    backend.enqueue("https://example.com/repo")
+    lease = backend.lease("worker-a", visibility_timeout=0.2)
+    expires_at = lease.expires_at
+
+    assert backend.heartbeat(lease, visibility_timeout=60)
+    assert lease.expires_at > expires_at
+    time.sleep(0.3)
+    assert backend.lease("worker-b", visibility_timeout=60) is None
+
+
+def test_expired_lease_is_retried_and_old_holder_loses_it(backend):
+    job_id = backend.enqueue("https://example.com/repo")
+    first = backend.lease("worker-a", visibility_timeout=0.1)
+    time.sleep(0.2)
+
+    second = backend.lease("worker-b", visibility_timeout=60)
+    assert second.job_id == job_id
+    assert second.attempt == 2
+
+    assert not backend.heartbeat(first, visibility_timeout=60)
+    assert not backend.complete(first, "stale")
+    assert backend.complete(second, "fresh")
+    assert backend.get(job_id)["result"] == "fresh"
+
+
+def test_failed_attempts_back_off_then_go_dead(backend, no_backoff):
+    job_id = backend.enqueue("https://example.com/repo", max_attempts=2)
+
+    lease = backend.lease("worker-a", visibility_timeout=60)
+    assert backend.fail(lease, "boom")
+    assert backend.get(job_id)["status"] == "queued"
+
+    lease = backend.lease("worker-a", visibility_timeout=60)
+    assert lease.attempt == 2
+    assert backend.fail(lease, "boom again")
+    job = backend.get(job_id)
+    assert job["status"] == "dead"
+    assert job["error"] == "boom again"
+    assert backend.lease("worker-a", visibility_timeout=60) is None
+
+
+def test_retry_waits_for_backoff(backend, monkeypatch):
+    monkeypatch.setattr(work_queue, "RETRY_BACKOFF_SECONDS", 60)
+    backend.enqueue("https://example.com/repo")
+
+    backend.fail(backend.lease("worker-a", visibility_timeout=60), "boom")
+    assert backend.lease("worker-a", visibility_timeout=60) is None
+
+
+def test_expired_final_attempt_goes_dead(backend):
+    job_id = backend.enqueue("https://example.com/repo", max_attempts=1)
+    backend.lease("worker-a", visibility_timeout=0.1)
+    time.sleep(0.2)
+
+    assert backend.lease("worker-b", visibility_timeout=60) is None
+    job = backend.get(job_id)
+    assert job["status"] == "dead"
+    assert job["error"] == "Lease expired after final attempt"
+
+
+def test_get_backend(tmp_path):
+    path = str(tmp_path / "q.db")
+    assert get_backend(path).path == path
+    assert get_backend(f"sqlite:///{path}").path == path
+    with pytest.raises(ValueError):
+        get_backend("redis://localhost/0")
+
+
+class FlakyHeartbeat:
+    """Backend whose heartbeat raises a few times before succeeding"""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+
+    def heartbeat(self, lease, visibility_timeout):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise sqlite3.OperationalError("database is locked")
+        lease.expires_at = time.time() + visibility_timeout
+        return True
+
+
+def run_heartbeat(backend, lease, seconds, visibility_timeout=0.3):
+    worker = Worker(backend, work_dir=".", visibility_timeout=visibility_timeout)
+    lost, done = threading.Event(), threading.Event()
+    thread = threading.Thread(target=worker._heartbeat, args=(lease, lost, done))
+    thread.start()
+    time.sleep(seconds)
+    done.set()
+    thread.join()
+    return lost.is_set()
+
+
+def test_heartbeat_survives_transient_errors(monkeypatch):
+    monkeypatch.setattr(work_queue, "HEARTBEAT_RETRY_SECONDS", 0.02)
+    backend = FlakyHeartbeat(failures=2)
+    lease = Lease("job", "url", "token", 1, time.time() + 0.3)
+
+    assert not run_heartbeat(backend, lease, seconds=0.5)
+    assert backend.calls > 2
+
+
+def test_heartbeat_gives_up_when_lease_runs_out(monkeypatch):
+    monkeypatch.setattr(work_queue, "HEARTBEAT_RETRY_SECONDS", 0.02)
+    backend = FlakyHeartbeat(failures=1000)
+    lease = Lease("job", "url", "token", 1, time.time() + 0.2)
+
+    assert run_heartbeat(backend, lease, seconds=0.5)
+
+
+def test_worker_discards_artifacts_of_a_lost_lease(backend, tmp_path, monkeypatch):
+    server = pytest.importorskip("new_latte.server")
+    llm_router = pytest.importorskip("new_latte.llm_router")
+    monkeypatch.setattr(llm_router, "build_llm", lambda: object())
+
+    job_id = backend.enqueue("https://example.com/repo")
+
+    def kickoff(llm, github_repo_url, workdir, cancel_event=None):
+        os.makedirs(workdir, exist_ok=True)
+        with open(os.path.join(workdir, "workflows.yaml"), "w") as f:
+            f.write("name: ci\n")
+        # Another worker takes over while this one is still running
+        time.sleep(0.2)
+        backend.lease("worker-b", visibility_timeout=60)
+        return "stale"
+
+    monkeypatch.setattr(server, "kickoff_in_workdir", kickoff)
+    results = tmp_path / "results"
+    worker = Worker(backend, str(tmp_path / "work"), str(results), visibility_timeout=0.1)
+
+    # Heartbeats would keep the lease alive; expire it deterministically instead
+    monkeypatch.setattr(worker, "_heartbeat", lambda lease, lost, done: None)
+    assert worker.run_one()
+
+    assert backend.get(job_id)["status"] == "leased"
+    assert backend.get(job_id)["leased_by"] == "worker-b"
+    assert not results.exists() or os.listdir(results) == []
+
+
+def test_worker_publishes_artifacts_on_completion(backend, tmp_path, monkeypatch):
+    server = pytest.importorskip("new_latte.server")
+    llm_router = pytest.importorskip("new_latte.llm_router")
+    monkeypatch.setattr(llm_router, "build_llm", lambda: object())
+
+    job_id = backend.enqueue("https://example.com/repo")
+
+    def kickoff(llm, github_repo_url, workdir, cancel_event=None):
+        os.makedirs(workdir, exist_ok=True)
+        with open(os.path.join(workdir, "workflows.yaml"), "w") as f:
+            f.write("name: ci\n")
+        return "ok"
+
+    monkeypatch.setattr(server, "kickoff_in_workdir", kickoff)
+    results = tmp_path / "results"
+    worker = Worker(backend, str(tmp_path / "work"), str(results), visibility_timeout=60)
+    assert worker.run_one()
+
+    assert backend.get(job_id)["status"] == "succeeded"
+    assert os.listdir(results) == [job_id]
+    assert (results / job_id / "workflows.yaml").read_text() == "name: ci\n"
+    # The clone and other scratch files are gone once the job is done
+    assert os.listdir(tmp_path / "work") == []
+
+
+def test_worker_does_not_fail_a_job_whose_completion_errors(backend, tmp_path, monkeypatch):
+    server = pytest.importorskip("new_latte.server")
+    llm_router = pytest.importorskip("new_latte.llm_router")
+    monkeypatch.setattr(llm_router, "build_llm", lambda: object())
+    monkeypatch.setattr(work_queue, "HEARTBEAT_RETRY_SECONDS", 0.02)
+
+    job_id = backend.enqueue("https://example.com/repo")
+
+    def kickoff(llm, github_repo_url, workdir, cancel_event=None):
+        os.makedirs(workdir, exist_ok=True)
+        with open(os.path.join(workdir, "workflows.yaml"), "w") as f:
+            f.write("name: ci\n")
+        return "ok"
+
+    def complete(lease, result):
+        raise sqlite3.OperationalError("database is locked")
+
+    failed = []
+    monkeypatch.setattr(server, "kickoff_in_workdir", kickoff)
+    monkeypatch.setattr(backend, "complete", complete)
+    monkeypatch.setattr(backend, "fail", lambda lease, error: failed.append(error))
+    results = tmp_path / "results"
+    worker = Worker(backend, str(tmp_path / "work"), str(results), visibility_timeout=0.2)
+    monkeypatch.setattr(worker, "_heartbeat", lambda lease, lost, done: None)
+    assert worker.run_one()
+
+    # Retried until the lease ran out, then left for another worker; never recorded as a failure
+    assert failed == []
+    assert backend.get(job_id)["status"] == "leased"
+    assert os.listdir(results) == []
+    assert os.listdir(tmp_path / "work") == []
+
+
+def test_run_forever_survives_backend_errors(backend, monkeypatch):
+    calls = []
+
+    def lease(worker_id, visibility_timeout):
+        calls.append(worker_id)
+        if len(calls) <= 2:
+            raise sqlite3.OperationalError("database is locked")
+        return None
+
+    monkeypatch.setattr(backend, "lease", lease)
+    worker = Worker(backend, work_dir=".", poll_interval=0)
+    worker.run_forever(stop_when_empty=True)
+
+    assert len(calls) == 3